@@ -1,7 +1,64 @@
 from langgraph.graph import StateGraph, END
 from typing import Dict, List, Any, TypedDict
 from pydantic import BaseModel
+from functools import lru_cache
+import asyncio
 import json
+import logging
+import os
+import re
+
+from config import (
+    GOOGLE_API_KEY,
+    MODEL_NAME,
+    EMBED_MODEL,
+    CHROMA_BATCH_SIZE,
+)
+from llm.client import LLMClient
+from llm.embedding_cache import CachedEmbeddings
+from strava.client import StravaClient
+from utils.chat_context import ChatContextManager
+from utils.chroma_manager import ChromaManager
+from utils.plotting_agent import PlottingAgent
+from utils.user_mapper import UserMapper
+
+log = logging.getLogger(__name__)
+
+# Fixed process layout - compute the directory roots once instead of
+# re-deriving them with os.path calls on every request
+_BASE_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+_CHROMA_ROOT = os.path.join(_BASE_DIR, "chroma_stores")
+_PLOTS_ROOT = "./plots"
+
+
+@lru_cache(maxsize=1)
+def get_llm_client() -> LLMClient:
+    """Process-wide LLMClient so Gemini sessions are built once, not per node"""
+    return LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
+
+
+@lru_cache(maxsize=64)
+def get_chroma_manager(user_id: str) -> ChromaManager:
+    """Per-user ChromaManager - reopening the persistent Chroma client
+    (SQLite + HNSW load) on every node dominates retrieval latency"""
+    chroma_dir = os.path.join(_CHROMA_ROOT, str(user_id))
+    cached_embeddings = CachedEmbeddings(
+        get_llm_client().embeddings,
+        os.path.join(chroma_dir, "embed_cache.sqlite"),
+    )
+    return ChromaManager(chroma_dir, cached_embeddings)
+
+
+# Precompiled markdown-stripping patterns for the response formatter.
+# Bold/italic/underline are collapsed into one alternation so the response
+# is traversed once instead of three times.
+_RE_EMPHASIS = re.compile(r"\*\*(.*?)\*\*|\*(.*?)\*|_(.*?)_")
+_RE_BULLET = re.compile(r"[-*]\s+")
+
+
+def _strip_emphasis(match):
+    """Return whichever emphasis group matched, without its markers"""
+    return match.group(match.lastindex)
 
 
 # State definition
@@ -23,308 +80,267 @@ class WorkflowState(TypedDict):
     skip_to_end: bool
 
 
+def _store_documents_batched(chroma_manager, docs):
+    """Insert documents into Chroma in CHROMA_BATCH_SIZE chunks"""
+    for start in range(0, len(docs), CHROMA_BATCH_SIZE):
+        batch = docs[start : start + CHROMA_BATCH_SIZE]
+        # The manager's embeddings are hash-cached, so unchanged runs
+        # don't hit the embedding API again on re-sync
+        embeddings = chroma_manager.embeddings.embed_documents(
+            [doc.page_content for doc in batch]
+        )
+        chroma_manager.add_documents(batch, embeddings=embeddings)
+
+
 # Agent functions
-def data_availability_check_agent(state: WorkflowState) -> WorkflowState:
+#
+# Nodes return only the fields they changed; LangGraph merges the partial
+# update into the full state (default overwrite reducer), which avoids
+# copying all 15 state keys on every transition.
+async def data_availability_check_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to check if user has data available before processing queries"""
-    print(f"🔍 [data_availability_check] Starting for user: {state.get('user_id')}")
-    print(f"🔍 [data_availability_check] Message: {state.get('user_message')}")
+    log.debug(
+        "[data_availability_check] starting for user %s: %s",
+        state.get("user_id"),
+        state.get("user_message"),
+    )
 
     try:
         # Skip this check for sync operations
         if state["user_message"] == "sync_data":
-            print(f"🔍 [data_availability_check] Sync operation - skipping check")
-            return state
+            log.debug("[data_availability_check] sync operation - skipping check")
+            return {}
 
-        from utils.chroma_manager import ChromaManager
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
+        # Check if user has any data in ChromaDB; count() reads the
+        # cardinality from Chroma's index without fetching any metadata
+        chroma_manager = get_chroma_manager(str(state["user_id"]))
+        run_count = await asyncio.to_thread(chroma_manager.count)
 
-        # Check if user has any data in ChromaDB
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-        print(f"🔍 [data_availability_check] LLM client initialized")
-
-        # Ensure chroma stores are in the new_bot directory
-        import os
-
-        chroma_dir = os.path.join("./chroma_stores", str(state["user_id"]))
-        print(f"🔍 [data_availability_check] ChromaDB directory: {chroma_dir}")
-
-        chroma_manager = ChromaManager(chroma_dir, llm_client.embeddings)
-        existing_runs = chroma_manager.get_existing_run_names()
-
-        print(
-            f"🔍 [data_availability_check] Existing runs found: {len(existing_runs) if existing_runs else 0}"
-        )
-
-        if not existing_runs:
-            print(f"🔍 [data_availability_check] No runs found - skipping to end")
+        if not run_count:
+            log.debug("[data_availability_check] no runs found - skipping to end")
             return {
-                **state,
                 "error": "No Strava data found. Use /sync to import your runs first.",
                 "final_response": "📊 No Strava data found. Use /sync to import your runs first.",
                 "skip_to_end": True,  # Flag to skip processing
             }
 
-        print(f"🔍 [data_availability_check] Runs found - proceeding with workflow")
-        return state
+        log.debug("[data_availability_check] runs found - proceeding with workflow")
+        return {}
 
     except Exception as e:
-        print(f"❌ [data_availability_check] Error: {e}")
+        log.error("[data_availability_check] error: %s", e)
         return {
-            **state,
             "error": f"Data availability check error: {str(e)}",
             "final_response": "📊 No Strava data found. Use /sync to import your runs first.",
             "skip_to_end": True,  # Flag to skip processing
         }
 
 
-def strava_agent(state: WorkflowState) -> WorkflowState:
+async def strava_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to fetch Strava data - ONLY for sync operations"""
     try:
         # Only run this agent for sync operations
         if state["user_message"] != "sync_data":
-            return {**state, "strava_data": [], "json_list": []}
-
-        from strava.client import StravaClient
-        from config import STRAVA_CLIENT_ID, STRAVA_CLIENT_SECRET
+            return {"strava_data": [], "json_list": []}
 
         # Get user's Strava token
         telegram_chat_id = state["user_id"]
 
-        # Use UserMapper to get user configuration
-        from utils.user_mapper import UserMapper
-
-        username = UserMapper.get_username_by_chat_id(telegram_chat_id)
-        if not username:
+        # Use UserMapper to get the full user configuration in one lookup
+        user_config = UserMapper.get_user_config(telegram_chat_id)
+        if not user_config:
             return {
-                **state,
                 "error": f"No user found for Telegram chat ID {telegram_chat_id}. Please set up your Strava connection.",
             }
 
-        strava_token = UserMapper.get_strava_token_by_chat_id(telegram_chat_id)
+        username = user_config["username"]
+        strava_token = user_config["refresh_token"]
         if not strava_token:
             return {
-                **state,
                 "error": f"No Strava refresh token found for user {username}. Please set up your Strava connection.",
             }
 
-        # Get user-specific Strava credentials if available, otherwise use global ones
-        user_client_id = (
-            UserMapper.get_strava_client_id_by_chat_id(telegram_chat_id)
-            or STRAVA_CLIENT_ID
-        )
-        user_client_secret = (
-            UserMapper.get_strava_client_secret_by_chat_id(telegram_chat_id)
-            or STRAVA_CLIENT_SECRET
-        )
-
         # Initialize Strava client with user-specific credentials
+        # (get_user_config already falls back to the global ones)
         strava_client = StravaClient(
-            user_client_id, user_client_secret, strava_token, username
+            user_config["client_id"],
+            user_config["client_secret"],
+            strava_token,
+            username,
         )
 
         # Check existing runs in vector store first
-        from utils.chroma_manager import ChromaManager
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
-
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-        # Ensure chroma stores are in the new_bot directory
-        import os
-
-        chroma_dir = os.path.join("./chroma_stores", str(telegram_chat_id))
-        chroma_manager = ChromaManager(chroma_dir, llm_client.embeddings)
-
-        existing_runs = chroma_manager.get_existing_run_names()
-        print(f"📊 Found {len(existing_runs)} existing runs in vector store")
+        chroma_manager = get_chroma_manager(str(telegram_chat_id))
+        existing_runs = await asyncio.to_thread(chroma_manager.get_existing_run_names)
+        log.debug("[strava_agent] %d existing runs in vector store", len(existing_runs))
 
         # Fetch only new runs from Strava
-        print("🔄 Fetching new runs from Strava...")
+        log.debug("[strava_agent] fetching new runs from Strava")
         try:
-            dfs = strava_client.fetch_all_runs()  # Fetch all runs
+            records = await asyncio.to_thread(strava_client.fetch_all_runs)
         except Exception as fetch_error:
-            print(f"⚠️ Error fetching runs from Strava: {fetch_error}")
+            log.warning("[strava_agent] error fetching runs from Strava: %s", fetch_error)
             # Return empty data instead of failing completely
             return {
-                **state,
                 "strava_data": [],
                 "json_list": [],
                 "error": f"Failed to fetch Strava data: {str(fetch_error)}",
             }
 
         # Filter out existing runs
-        new_dfs = []
-        for df in dfs:
+        new_records = []
+        for record in records:
             try:
-                run_name = df["Activity_Name"].iloc[0] if not df.empty else ""
+                run_name = record.get("Name", "")
                 if run_name not in existing_runs:
-                    new_dfs.append(df)
-                    print(f"🆕 New run found: {run_name}")
+                    new_records.append(record)
+                    log.debug("[strava_agent] new run found: %s", run_name)
                 else:
-                    print(f"✅ Run already exists: {run_name}")
+                    log.debug("[strava_agent] run already exists: %s", run_name)
             except Exception as filter_error:
-                print(f"⚠️ Error processing run data: {filter_error}")
+                log.warning("[strava_agent] error processing run data: %s", filter_error)
                 continue
 
         # Convert to JSON
         json_list = []
-        if new_dfs:
+        if new_records:
             try:
-                json_list = strava_client.convert_to_json_list(new_dfs)
+                json_list = strava_client.convert_to_json_list(new_records)
             except Exception as json_error:
-                print(f"⚠️ Error converting to JSON: {json_error}")
+                log.warning("[strava_agent] error converting to JSON: %s", json_error)
                 # Continue with empty JSON list
 
-        return {**state, "strava_data": new_dfs, "json_list": json_list}
+        return {"strava_data": new_records, "json_list": json_list}
     except Exception as e:
-        print(f"❌ Strava agent error: {str(e)}")
-        return {**state, "error": f"Strava agent error: {str(e)}"}
+        log.error("[strava_agent] error: %s", e)
+        return {"error": f"Strava agent error: {str(e)}"}
 
 
-def document_creator_agent(state: WorkflowState) -> WorkflowState:
+async def document_creator_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to create documents from JSON data - ONLY for sync operations"""
     try:
         # Only run this agent for sync operations
         if state["user_message"] != "sync_data":
-            return {**state, "documents": []}
+            return {"documents": []}
 
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
-
-        # Initialize LLM client
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
+        llm_client = get_llm_client()
 
         # Create documents only if there are new runs
         if state["json_list"]:
-            documents = llm_client.create_documents(state["json_list"])
-            print(f"📝 Created {len(documents)} new documents")
+            documents = await asyncio.to_thread(
+                llm_client.create_documents, state["json_list"]
+            )
+            log.debug("[document_creator] created %d new documents", len(documents))
         else:
             documents = []
-            print("✅ No new runs to process")
+            log.debug("[document_creator] no new runs to process")
 
-        return {**state, "documents": documents}
+        return {"documents": documents}
     except Exception as e:
-        return {**state, "error": f"Document creator error: {str(e)}"}
+        return {"error": f"Document creator error: {str(e)}"}
 
 
-def document_storage_agent(state: WorkflowState) -> WorkflowState:
+async def document_storage_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to store documents in vector store - ONLY for sync operations"""
     try:
         # Only run this agent for sync operations
         if state["user_message"] != "sync_data":
-            return {**state, "storage_status": "skipped"}
+            return {"storage_status": "skipped"}
 
         # Only store if there are new documents
         if not state.get("documents"):
-            return {**state, "storage_status": "no_new_documents"}
-
-        from utils.chroma_manager import ChromaManager
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL, CHROMA_DB_DIR
+            return {"storage_status": "no_new_documents"}
 
-        # Initialize components
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-        # Use absolute path to ensure correct ChromaDB access
-        import os
+        chroma_manager = get_chroma_manager(str(state["user_id"]))
 
-        chroma_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "chroma_stores",
-            str(state["user_id"]),
+        # Store documents in bounded batches, embedding each batch in a
+        # single call outside of Chroma's add transaction
+        await asyncio.to_thread(
+            _store_documents_batched, chroma_manager, state["documents"]
         )
-        chroma_manager = ChromaManager(chroma_dir, llm_client.embeddings)
-
-        # Store documents
-        chroma_manager.add_documents(state["documents"])
 
         return {
-            **state,
             "storage_status": f"stored_{len(state['documents'])}_documents",
         }
     except Exception as e:
-        return {**state, "error": f"Document storage error: {str(e)}"}
+        return {"error": f"Document storage error: {str(e)}"}
 
 
-def query_interpreter_agent(state: WorkflowState) -> WorkflowState:
+async def query_interpreter_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to interpret user query"""
-    print(f"🔍 [query_interpreter] Starting for user: {state.get('user_id')}")
-    print(f"🔍 [query_interpreter] Message: {state.get('user_message')}")
+    log.debug(
+        "[query_interpreter] starting for user %s: %s",
+        state.get("user_id"),
+        state.get("user_message"),
+    )
 
     try:
         # Skip query interpretation for sync_data message
         if state["user_message"] == "sync_data":
-            print(f"🔍 [query_interpreter] Sync operation - skipping interpretation")
-            return {**state, "query": {"type": "sync", "action": "sync_data"}}
+            log.debug("[query_interpreter] sync operation - skipping interpretation")
+            return {"query": {"type": "sync", "action": "sync_data"}}
 
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
-
-        # Initialize LLM client
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-        print(f"🔍 [query_interpreter] LLM client initialized")
+        llm_client = get_llm_client()
 
         # Interpret query
-        print(f"🔍 [query_interpreter] Interpreting query...")
-        query = llm_client.interpret_query(state["user_message"])
-        print(f"🔍 [query_interpreter] Query interpreted: {query}")
+        query = await llm_client.ainterpret_query(state["user_message"])
+        log.debug("[query_interpreter] query interpreted: %s", query)
 
-        return {**state, "query": query}
+        return {"query": query}
     except Exception as e:
-        print(f"❌ [query_interpreter] Error: {e}")
-        return {**state, "error": f"Query interpreter error: {str(e)}"}
+        log.error("[query_interpreter] error: %s", e)
+        return {"error": f"Query interpreter error: {str(e)}"}
 
 
-def document_retriever_agent(state: WorkflowState) -> WorkflowState:
+async def document_retriever_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to retrieve relevant documents"""
-    print(f"🔍 [document_retriever] Starting for user: {state.get('user_id')}")
-    print(f"🔍 [document_retriever] Query: {state.get('query')}")
+    log.debug(
+        "[document_retriever] starting for user %s, query: %s",
+        state.get("user_id"),
+        state.get("query"),
+    )
 
     try:
         # Handle sync_data case
         if state["query"].get("type") == "sync":
-            print(f"🔍 [document_retriever] Sync operation - skipping retrieval")
+            log.debug("[document_retriever] sync operation - skipping retrieval")
             return {
-                **state,
                 "retrieved_docs": [],
                 "context": "Data sync in progress...",
             }
 
-        from utils.chroma_manager import ChromaManager
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL, CHROMA_DB_DIR
-
-        # Initialize components
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-        print(f"🔍 [document_retriever] LLM client initialized")
-
-        # Use absolute path to ensure correct ChromaDB access
-        import os
-
-        chroma_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "chroma_stores",
-            str(state["user_id"]),
-        )
-        chroma_manager = ChromaManager(chroma_dir, llm_client.embeddings)
-        print(f"🔍 [document_retriever] ChromaManager initialized")
+        chroma_manager = get_chroma_manager(str(state["user_id"]))
 
         # Retrieve documents based on query
-        # If specific run names are requested, use optimized method
+        # If specific run names are requested, the name lookup and the
+        # latest-N fallback share a single Chroma read
+        used_fallback = False
         if state["query"].get("run_names"):
-            retrieved_docs = chroma_manager.get_runs_by_names(
-                state["query"]["run_names"]
+            log.debug(
+                "[document_retriever] searching for specific runs: %s",
+                state["query"]["run_names"],
+            )
+            retrieved_docs, matched = await asyncio.to_thread(
+                chroma_manager.get_runs_or_latest, state["query"]["run_names"], 5
             )
-            print(f"🔍 Searching for specific runs: {state['query']['run_names']}")
+            used_fallback = not matched
         else:
-            retrieved_docs = chroma_manager.retrieve_runs(state["query"])
-
-        # If no documents found, get latest 5 runs filtered by date
-        if not retrieved_docs:
-            retrieved_docs = chroma_manager.get_latest_runs(5)
-            print(
-                f"⚠️ No specific runs found, returning latest {len(retrieved_docs)} runs"
+            retrieved_docs = await asyncio.to_thread(
+                chroma_manager.retrieve_runs, state["query"]
             )
 
+            # If no documents found, get latest 5 runs filtered by date
+            if not retrieved_docs:
+                retrieved_docs = await asyncio.to_thread(
+                    chroma_manager.get_latest_runs, 5
+                )
+                used_fallback = True
+
+        if used_fallback:
+            log.debug(
+                "[document_retriever] no specific runs found, returning latest %d runs",
+                len(retrieved_docs),
+            )
             # Add context about using latest runs
             if retrieved_docs:
                 context = chroma_manager.docs_to_context(
@@ -333,168 +349,172 @@ def document_retriever_agent(state: WorkflowState) -> WorkflowState:
                 context = f"📊 No specific runs found for your query. Here are your latest 5 runs for context:\n\n{context}"
             else:
                 context = "No run data available."
-        else:
-            print(f"📊 Found {len(retrieved_docs)} relevant runs")
+        elif retrieved_docs:
+            log.debug("[document_retriever] found %d relevant runs", len(retrieved_docs))
             context = chroma_manager.docs_to_context(
                 retrieved_docs, include_per_km=True
             )
+        else:
+            context = "No run data available."
 
-        # Print document retrieval info for debugging
-        print(f"\n📚 DOCUMENT RETRIEVAL:")
-        print(f"Query: {state['query']}")
-        print(f"Retrieved {len(retrieved_docs)} documents")
-        for i, doc in enumerate(retrieved_docs[:3]):  # Show first 3 docs
-            print(
-                f"  {i+1}. {doc.metadata.get('name', 'Unknown')} - {doc.metadata.get('date', 'No date')}"
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug(
+                "[document_retriever] retrieved %d documents for query %s",
+                len(retrieved_docs),
+                state["query"],
             )
-        if len(retrieved_docs) > 3:
-            print(f"  ... and {len(retrieved_docs) - 3} more documents")
-        print(f"Context length: {len(context)} characters")
+            for i, doc in enumerate(retrieved_docs[:3]):  # Show first 3 docs
+                log.debug(
+                    "  %d. %s - %s",
+                    i + 1,
+                    doc.metadata.get("name", "Unknown"),
+                    doc.metadata.get("date", "No date"),
+                )
 
-        return {**state, "retrieved_docs": retrieved_docs, "context": context}
+        return {"retrieved_docs": retrieved_docs, "context": context}
     except Exception as e:
-        return {**state, "error": f"Document retriever error: {str(e)}"}
+        return {"error": f"Document retriever error: {str(e)}"}
 
 
-def coach_agent(state: WorkflowState) -> WorkflowState:
+async def coach_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to provide coaching response"""
-    print(f"🔍 [coach_agent] Starting for user: {state.get('user_id')}")
-    print(f"🔍 [coach_agent] Query: {state.get('query')}")
-    print(f"🔍 [coach_agent] Context: {state.get('context', '')[:100]}...")
+    log.debug("[coach_agent] starting for user %s", state.get("user_id"))
+    log.debug("[coach_agent] context: %.100s", state.get("context", ""))
 
     try:
         # Handle sync_data case
         if state["query"].get("type") == "sync":
-            print(f"🔍 [coach_agent] Sync operation - skipping coaching")
-            return {**state, "coach_response": "Data sync completed successfully!"}
+            log.debug("[coach_agent] sync operation - skipping coaching")
+            return {"coach_response": "Data sync completed successfully!"}
 
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
-        from utils.chroma_manager import ChromaManager
-
-        # Initialize LLM client
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-        print(f"🔍 [coach_agent] LLM client initialized")
+        llm_client = get_llm_client()
 
         # Get chat context
-        from utils.chat_context import ChatContextManager
-
         chat_manager = ChatContextManager()
-        chat_context = chat_manager.get_chat_summary(state["user_id"])
-        print(
-            f"🔍 [coach_agent] Chat context retrieved: {len(chat_context) if chat_context else 0} chars"
+        chat_context = await asyncio.to_thread(
+            chat_manager.get_chat_summary, state["user_id"]
         )
 
         # Get coaching response
-        print(f"🔍 [coach_agent] Getting coaching response...")
-        coach_response = llm_client.get_coach_response(
+        coach_chunks = []
+        async for chunk in llm_client.aget_coach_response(
             state["context"], state["user_message"], chat_context
-        )
-        print(
-            f"🔍 [coach_agent] Coaching response generated: {len(coach_response) if coach_response else 0} chars"
-        )
-
-        # Print the Fitness Coach's output for debugging
-        print("\n" + "=" * 80)
-        print("🏃‍♂️ FITNESS COACH RESPONSE:")
-        print("=" * 80)
-        print(coach_response)
-        print("=" * 80 + "\n")
+        ):
+            coach_chunks.append(chunk)
+        coach_response = "".join(coach_chunks)
+        log.debug("[coach_agent] coaching response: %s", coach_response)
 
-        return {**state, "coach_response": coach_response}
+        return {"coach_response": coach_response}
     except Exception as e:
-        print(f"❌ [coach_agent] Error: {e}")
-        return {**state, "error": f"Coach agent error: {str(e)}"}
+        log.error("[coach_agent] error: %s", e)
+        return {"error": f"Coach agent error: {str(e)}"}
 
 
-def plotting_agent(state: WorkflowState) -> WorkflowState:
+async def plotting_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to generate plots"""
     try:
         # Handle sync_data case - no plots needed
         if state["query"].get("type") == "sync":
-            return {**state, "plot_path": ""}
+            return {"plot_path": ""}
+
+        # Skip the plot pipeline (Gemini call + matplotlib render) when
+        # the interpreter flagged the query as non-visual
+        if not state["query"].get("wants_plot", True):
+            log.debug("[plotting_agent] non-visual query - skipping plot")
+            return {"plot_path": ""}
 
-        # Always try to generate plots for every scenario
         # The plotting agent will handle failures gracefully
 
-        from utils.plotting_agent import PlottingAgent
-        from utils.chroma_manager import ChromaManager
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
+        llm_client = get_llm_client()
 
-        # Initialize components
-        llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
         # Ensure plots are saved to the new_bot/plots directory
-        import os
-
-        plots_dir = os.path.join("./plots", str(state["user_id"]))
+        plots_dir = os.path.join(_PLOTS_ROOT, str(state["user_id"]))
         plotting_agent = PlottingAgent(plots_dir)
 
-        # Convert context to DataFrame
-        chroma_dir = os.path.join(
-            os.path.dirname(os.path.dirname(__file__)),
-            "chroma_stores",
-            str(state["user_id"]),
+        # Build the DataFrame straight from the retrieved documents -
+        # their metadata already holds the structured fields, so there's
+        # no need to regex-parse the formatted context string back apart
+        chroma_manager = get_chroma_manager(str(state["user_id"]))
+        df = chroma_manager.docs_to_dataframe(
+            state.get("retrieved_docs") or [], include_per_km=True
         )
-        chroma_manager = ChromaManager(chroma_dir, llm_client.embeddings)
-        df = chroma_manager.context_to_dataframe(state["context"])
 
         # Skip if DataFrame is empty
         if df.empty:
-            return {**state, "plot_path": ""}
+            return {"plot_path": ""}
 
         # Generate plot
-        print(f"\n📊 Attempting to generate plot for: {state['user_message']}")
+        log.debug("[plotting_agent] attempting plot for: %s", state["user_message"])
         plot_path = ""
 
         try:
-            plot_path = plotting_agent.generate_plot(
+            plot_path = await asyncio.to_thread(
+                plotting_agent.generate_plot,
                 df,
                 state["user_message"],
                 state["coach_response"],  # Add the missing llm_response parameter
                 llm_client,
             )
             if plot_path:
-                print(f"✅ AI plot generated successfully: {plot_path}")
+                log.debug("[plotting_agent] AI plot generated: %s", plot_path)
             else:
-                print("⚠️ AI plot generation returned no path")
+                log.debug("[plotting_agent] AI plot generation returned no path")
         except Exception as e:
-            print(f"⚠️ AI plotting failed: {e}, falling back to simple plot")
+            log.warning(
+                "[plotting_agent] AI plotting failed: %s, falling back to simple plot", e
+            )
             try:
-                plot_path = plotting_agent.create_simple_plot(df, state["user_message"])
+                plot_path = await asyncio.to_thread(
+                    plotting_agent.create_simple_plot, df, state["user_message"]
+                )
                 if plot_path:
-                    print(f"✅ Simple plot fallback generated: {plot_path}")
+                    log.debug("[plotting_agent] simple plot fallback: %s", plot_path)
             except Exception as fallback_error:
-                print(f"❌ Simple plot fallback also failed: {fallback_error}")
+                log.error(
+                    "[plotting_agent] simple plot fallback also failed: %s",
+                    fallback_error,
+                )
                 plot_path = ""
 
-        # If still no plot, try one more time with simple plot
-        if not plot_path:
-            print("🔄 Final attempt with simple plot...")
-            try:
-                plot_path = plotting_agent.create_simple_plot(df, state["user_message"])
-                if plot_path:
-                    print(f"✅ Final simple plot generated: {plot_path}")
-                else:
-                    print("❌ No plot could be generated")
-            except Exception as final_error:
-                print(f"❌ Final plot attempt failed: {final_error}")
-                plot_path = ""
+        log.debug("[plotting_agent] final plot path: %s", plot_path or "None")
 
-        print(f"📊 Final plot path: {plot_path or 'None'}")
+        return {"plot_path": plot_path or ""}
+    except Exception as e:
+        return {"error": f"Plotting agent error: {str(e)}"}
+
+
+async def parallel_analysis_agent(state: WorkflowState) -> Dict[str, Any]:
+    """Run the coach and plotting agents concurrently.
+
+    The plot spec is generated from the retrieved context and the user's
+    question alone (the coach response is only an optional hint), so the
+    two Gemini calls don't need to serialize - wall clock drops from the
+    sum of both latencies to the max.
+    """
+    try:
+        # Sync operations skip plotting entirely
+        if state["query"].get("type") == "sync":
+            coach_state = await coach_agent(state)
+            return {**coach_state, "plot_path": ""}
+
+        coach_state, plot_state = await asyncio.gather(
+            coach_agent(state),
+            plotting_agent({**state, "coach_response": ""}),
+        )
 
-        return {**state, "plot_path": plot_path or ""}
+        merged = {**coach_state, "plot_path": plot_state.get("plot_path", "")}
+        if not merged.get("error") and plot_state.get("error"):
+            merged["error"] = plot_state["error"]
+        return merged
     except Exception as e:
-        return {**state, "error": f"Plotting agent error: {str(e)}"}
+        return {"error": f"Parallel analysis error: {str(e)}"}
 
 
-def response_formatter_agent(state: WorkflowState) -> WorkflowState:
+async def response_formatter_agent(state: WorkflowState) -> Dict[str, Any]:
     """Agent to format final response"""
-    print(f"🔍 [response_formatter] Starting for user: {state.get('user_id')}")
-    print(
-        f"🔍 [response_formatter] Coach response: {state.get('coach_response', '')[:100]}..."
-    )
-    print(f"🔍 [response_formatter] Plot path: {state.get('plot_path', 'None')}")
+    log.debug("[response_formatter] starting for user %s", state.get("user_id"))
+    log.debug("[response_formatter] coach response: %.100s", state.get("coach_response", ""))
+    log.debug("[response_formatter] plot path: %s", state.get("plot_path", "None"))
 
     try:
         # Format the final response
@@ -503,47 +523,28 @@ def response_formatter_agent(state: WorkflowState) -> WorkflowState:
         # Always include the coach response
         if state.get("coach_response"):
             coach_response = state["coach_response"]
-            print(
-                f"🔍 [response_formatter] Processing coach response: {len(coach_response)} chars"
-            )
 
             # Clean up the response - remove problematic markdown and make it readable
-            import re
-
-            # Remove markdown formatting that causes issues
-            coach_response = re.sub(
-                r"\*\*(.*?)\*\*", r"\1", coach_response
-            )  # Remove bold
-            coach_response = re.sub(
-                r"\*(.*?)\*", r"\1", coach_response
-            )  # Remove italic
-            coach_response = re.sub(
-                r"_(.*?)_", r"\1", coach_response
-            )  # Remove underline
+            # Remove bold/italic/underline in a single pass
+            coach_response = _RE_EMPHASIS.sub(_strip_emphasis, coach_response)
 
             # Replace problematic characters with simple alternatives
             coach_response = coach_response.replace("\\", "")  # Remove backslashes
             coach_response = coach_response.replace("`", "'")  # Replace backticks
 
             # Ensure bullet points are simple
-            coach_response = re.sub(r"[-*]\s+", "• ", coach_response)
+            coach_response = _RE_BULLET.sub("• ", coach_response)
 
             # Truncate if too long (Telegram limit is ~4096 characters)
             if len(coach_response) > 3000:  # Leave more buffer
-                # Try to truncate at a sentence boundary
-                sentences = coach_response.split(". ")
-                truncated = ""
-                for sentence in sentences:
-                    if len(truncated + sentence + ". ") <= 3000:
-                        truncated += sentence + ". "
-                    else:
-                        break
+                # Cut at the last sentence boundary before the cap
+                cut = coach_response.rfind(". ", 0, 3000)
+                cut = cut + 1 if cut != -1 else 3000
                 coach_response = (
-                    truncated.strip() + "\n\n... (response truncated for readability)"
-                )
-                print(
-                    f"🔍 [response_formatter] Response truncated to {len(coach_response)} chars"
+                    coach_response[:cut].rstrip()
+                    + "\n\n... (response truncated for readability)"
                 )
+                log.debug("[response_formatter] response truncated")
 
             response_parts.append(coach_response)
 
@@ -552,82 +553,81 @@ def response_formatter_agent(state: WorkflowState) -> WorkflowState:
             response_parts.append(
                 "📊 I've generated a visualization for you. Check the attached image!"
             )
-            print(f"🔍 [response_formatter] Plot info added to response")
+            log.debug("[response_formatter] plot info added to response")
         else:
             # If no plot was generated, inform the user
             response_parts.append("📊 No visualization available for this analysis.")
-            print(f"🔍 [response_formatter] No plot info added to response")
+            log.debug("[response_formatter] no plot info added to response")
 
         # If no coach response, provide a fallback
         if not response_parts:
             response_parts.append(
                 "I couldn't generate a response for your question. Please try rephrasing it."
             )
-            print(f"🔍 [response_formatter] Using fallback response")
+            log.debug("[response_formatter] using fallback response")
 
         final_response = "\n\n".join(response_parts)
-        print(
-            f"🔍 [response_formatter] Final response length: {len(final_response)} chars"
-        )
 
-        return {**state, "final_response": final_response}
+        return {"final_response": final_response}
     except Exception as e:
-        print(f"❌ [response_formatter] Error: {e}")
-        return {**state, "error": f"Response formatter error: {str(e)}"}
+        log.error("[response_formatter] error: %s", e)
+        return {"error": f"Response formatter error: {str(e)}"}
 
 
-def personal_info_checker(state: WorkflowState) -> WorkflowState:
+async def personal_info_checker(state: WorkflowState) -> Dict[str, Any]:
     """Check if user needs to provide personal information"""
-    print(f"🔍 [personal_info_checker] Starting for user: {state.get('user_id')}")
+    log.debug("[personal_info_checker] starting for user %s", state.get("user_id"))
 
     try:
-        from utils.chat_context import ChatContextManager
+        # Skip for sync operations - the questions are irrelevant and the
+        # context read would be thrown away
+        if state.get("user_message") == "sync_data":
+            log.debug("[personal_info_checker] sync operation - skipping check")
+            return {"needs_personal_info": False, "personal_info_questions": []}
 
         chat_manager = ChatContextManager()
-        questions = chat_manager.ask_for_personal_info(state["user_id"])
+        questions = await asyncio.to_thread(
+            chat_manager.ask_for_personal_info, state["user_id"]
+        )
 
         needs_info = len(questions) > 0
-        print(f"🔍 [personal_info_checker] User needs info: {needs_info}")
-        print(f"🔍 [personal_info_checker] Questions: {questions}")
+        log.debug(
+            "[personal_info_checker] needs info: %s, questions: %s",
+            needs_info,
+            questions,
+        )
 
-        result = {
-            **state,
+        return {
             "needs_personal_info": needs_info,
             "personal_info_questions": questions,
         }
 
-        print(f"✅ [personal_info_checker] Completed successfully")
-        return result
-
     except Exception as e:
-        print(f"❌ [personal_info_checker] Error: {e}")
-        return {**state, "error": f"Personal info checker error: {str(e)}"}
+        log.error("[personal_info_checker] error: %s", e)
+        return {"error": f"Personal info checker error: {str(e)}"}
 
 
 # Create the workflow
 def create_workflow():
     """Create the LangGraph workflow"""
 
-    print("🔧 Creating LangGraph workflow...")
+    log.debug("Creating LangGraph workflow...")
 
     # Create the graph
     workflow = StateGraph(WorkflowState)
 
     # Add nodes
-    print("🔧 Adding workflow nodes...")
     workflow.add_node("data_availability_check", data_availability_check_agent)
     workflow.add_node("strava_agent", strava_agent)
     workflow.add_node("document_creator", document_creator_agent)
     workflow.add_node("document_storage", document_storage_agent)
     workflow.add_node("query_interpreter", query_interpreter_agent)
     workflow.add_node("document_retriever", document_retriever_agent)
-    workflow.add_node("coach_agent", coach_agent)
-    workflow.add_node("plotting_agent", plotting_agent)
+    workflow.add_node("parallel_analysis", parallel_analysis_agent)
     workflow.add_node("response_formatter", response_formatter_agent)
     workflow.add_node("personal_info_checker", personal_info_checker)
 
     # Define the flow
-    print("🔧 Setting workflow flow...")
     workflow.set_entry_point("personal_info_checker")
 
     # Main flow
@@ -647,23 +647,30 @@ def create_workflow():
     workflow.add_edge("document_creator", "document_storage")
     workflow.add_edge("document_storage", "query_interpreter")
     workflow.add_edge("query_interpreter", "document_retriever")
-    workflow.add_edge("document_retriever", "coach_agent")
-    workflow.add_edge("coach_agent", "plotting_agent")
-    workflow.add_edge("plotting_agent", "response_formatter")
+    # Coach and plotting fan out inside a single node and merge before
+    # formatting
+    workflow.add_edge("document_retriever", "parallel_analysis")
+    workflow.add_edge("parallel_analysis", "response_formatter")
     workflow.add_edge("response_formatter", END)
 
-    print("🔧 Compiling workflow...")
+    # No checkpointer: every invocation starts from a fresh initial
+    # state, so checkpoints would never be resumed and a MemorySaver
+    # would just accumulate one state history per user for the process
+    # lifetime.
     compiled_workflow = workflow.compile()
-    print("✅ Workflow compiled successfully!")
+    log.debug("Workflow compiled successfully")
 
     return compiled_workflow
 
 
-# Create the workflow instance
-print("🚀 Creating workflow instance...")
-workflow_graph = create_workflow()
-print("✅ Workflow instance created successfully!")
-print(f"🔍 Workflow type: {type(workflow_graph)}")
-print(
-    f"🔍 Workflow methods: {[m for m in dir(workflow_graph) if not m.startswith('_')]}"
-)
+# Lazy singleton - building and compiling the graph at import time made
+# every importer pay the full LangGraph compile cost before serving
+_workflow_graph = None
+
+
+def get_workflow_graph():
+    """Get the compiled workflow, building it on first use"""
+    global _workflow_graph
+    if _workflow_graph is None:
+        _workflow_graph = create_workflow()
+    return _workflow_graph
@@ -17,6 +17,7 @@ Author: Etqad Khan
 Version: 1.0.0
 """
 
+import logging
 import os
 from dotenv import load_dotenv
 
@@ -24,6 +25,13 @@ from dotenv import load_dotenv
 # This must be called before accessing any environment variables
 load_dotenv()
 
+# =============================================================================
+# Logging Configuration
+# =============================================================================
+# Agents log through the logging module so debug messages cost nothing
+# unless LOG_LEVEL=DEBUG is set
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO"))
+
 # =============================================================================
 # Strava API Configuration
 # =============================================================================
@@ -58,20 +66,31 @@ TELEGRAM_TOKEN = os.getenv("TELEGRAM_TOKEN")
 # Defaults to "./chroma_stores" relative to the application root
 CHROMA_DB_DIR = os.getenv("CHROMA_DB_DIR", "./chroma_stores")
 
+# Number of documents inserted per ChromaDB batch
+# 100-250 is the throughput sweet spot; larger batches regress and
+# smaller ones pay per-transaction overhead
+CHROMA_BATCH_SIZE = int(os.getenv("CHROMA_BATCH_SIZE", "128"))
+
 # =============================================================================
 # User Configuration
 # =============================================================================
-# JSON string containing user-specific configurations
+# User-specific configurations
 # Format: {"username": {"chat_id": "123", "strava_refresh_token": "token"}}
+# Authoritative store is users.json (TokenManager persists rotated Strava
+# refresh tokens there); the USERS env var remains as the legacy fallback
+# until the first run migrates it over.
+USERS_FILE = os.getenv("USERS_FILE", "users.json")
 USERS_JSON = os.getenv("USERS")
 
-# Parse the USERS JSON string into a Python dictionary
-# This enables multi-user support with different Strava accounts
 try:
     import json
 
-    USERS = json.loads(USERS_JSON) if USERS_JSON else {}
-except json.JSONDecodeError:
-    # If JSON parsing fails, use empty dictionary
+    if os.path.exists(USERS_FILE):
+        with open(USERS_FILE, "r") as _users_fh:
+            USERS = json.load(_users_fh)
+    else:
+        USERS = json.loads(USERS_JSON) if USERS_JSON else {}
+except (json.JSONDecodeError, OSError):
+    # If parsing fails, use empty dictionary
     # This prevents the application from crashing on invalid JSON
     USERS = {}
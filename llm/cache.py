@@ -0,0 +1,172 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import List, Optional
+
+import numpy as np
+
+
+class LLMCache:
+    """Two-tier cache for LLM responses.
+
+    L1 is an exact cache keyed by SHA-256 of (model, prompt_text) stored in
+    SQLite so it survives restarts. L2 is a semantic cache: user queries are
+    embedded and a cached response is reused when cosine similarity against
+    a recent entry exceeds the threshold.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        embeddings=None,
+        cache_dir: str = "./llm_cache",
+        semantic_threshold: float = 0.95,
+        max_semantic_entries: int = 200,
+    ):
+        self.model_name = model_name
+        self.embeddings = embeddings
+        self.semantic_threshold = semantic_threshold
+        self.max_semantic_entries = max_semantic_entries
+        self.stats = {"hits": 0, "misses": 0}
+
+        # Ensure cache directory exists
+        if not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+
+        self.db_path = os.path.join(cache_dir, "llm_cache.db")
+        self._init_db()
+
+    def _init_db(self):
+        """Create cache tables if they don't exist"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS exact_cache ("
+                "key TEXT PRIMARY KEY, response TEXT)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS semantic_cache ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                "namespace TEXT DEFAULT '', "
+                "vector TEXT, response TEXT)"
+            )
+            # Migrate caches created before namespacing was added
+            try:
+                conn.execute(
+                    "ALTER TABLE semantic_cache ADD COLUMN namespace TEXT DEFAULT ''"
+                )
+            except sqlite3.OperationalError:
+                pass
+            conn.commit()
+        finally:
+            conn.close()
+
+    def _exact_key(self, prompt_text: str) -> str:
+        """SHA-256 key over (model, prompt_text)"""
+        payload = f"{self.model_name}::{prompt_text}"
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(
+        self, prompt_text: str, semantic_text: str = None, namespace: str = ""
+    ) -> Optional[str]:
+        """Look up a cached response, exact match first then semantic.
+
+        namespace partitions the semantic tier (e.g. by a hash of the
+        retrieved context) so similar questions against different data
+        never share a response.
+        """
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                # L1: exact match on the rendered prompt
+                row = conn.execute(
+                    "SELECT response FROM exact_cache WHERE key = ?",
+                    (self._exact_key(prompt_text),),
+                ).fetchone()
+                if row:
+                    self.stats["hits"] += 1
+                    return row[0]
+
+                # L2: semantic match on the user's query text
+                if semantic_text and self.embeddings:
+                    response = self._semantic_lookup(conn, semantic_text, namespace)
+                    if response is not None:
+                        self.stats["hits"] += 1
+                        return response
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"⚠️ LLM cache lookup failed: {e}")
+
+        self.stats["misses"] += 1
+        return None
+
+    def set(
+        self,
+        prompt_text: str,
+        response: str,
+        semantic_text: str = None,
+        namespace: str = "",
+    ):
+        """Store a response under the exact key and optionally the semantic tier"""
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO exact_cache (key, response) VALUES (?, ?)",
+                    (self._exact_key(prompt_text), response),
+                )
+
+                if semantic_text and self.embeddings:
+                    vec = self.embeddings.embed_query(semantic_text)
+                    conn.execute(
+                        "INSERT INTO semantic_cache (namespace, vector, response) "
+                        "VALUES (?, ?, ?)",
+                        (namespace, json.dumps(vec), response),
+                    )
+                    # Keep only the most recent N semantic entries
+                    conn.execute(
+                        "DELETE FROM semantic_cache WHERE id NOT IN ("
+                        "SELECT id FROM semantic_cache ORDER BY id DESC LIMIT ?)",
+                        (self.max_semantic_entries,),
+                    )
+
+                conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"⚠️ LLM cache store failed: {e}")
+
+    def _semantic_lookup(
+        self, conn, semantic_text: str, namespace: str = ""
+    ) -> Optional[str]:
+        """Compare the query embedding against recent cached entries"""
+        rows = conn.execute(
+            "SELECT vector, response FROM semantic_cache "
+            "WHERE namespace = ? ORDER BY id DESC LIMIT ?",
+            (namespace, self.max_semantic_entries),
+        ).fetchall()
+        if not rows:
+            return None
+
+        query_vec = np.array(self.embeddings.embed_query(semantic_text), dtype=float)
+        query_norm = np.linalg.norm(query_vec)
+        if query_norm == 0:
+            return None
+
+        best_score = -1.0
+        best_response = None
+        for vector_json, response in rows:
+            vec = np.array(json.loads(vector_json), dtype=float)
+            norm = np.linalg.norm(vec)
+            if norm == 0:
+                continue
+            score = float(np.dot(query_vec, vec) / (query_norm * norm))
+            if score > best_score:
+                best_score = score
+                best_response = response
+
+        if best_score >= self.semantic_threshold:
+            return best_response
+        return None
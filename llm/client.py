@@ -1,22 +1,95 @@
 from langchain_google_genai import ChatGoogleGenerativeAI, GoogleGenerativeAIEmbeddings
-from langchain.prompts import PromptTemplate
 from langchain.schema import Document
-from typing import List
+from typing import AsyncIterator, List
+import asyncio
+import hashlib
 import json
+import re
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 
+from llm.cache import LLMCache
+
+try:
+    import simdjson
+except ImportError:
+    simdjson = None
+
+def _split_on_placeholders(template: str, variables: List[str]) -> List:
+    """Split a template once into static segments and variable slots.
+
+    Static text is kept as interned str segments (with {{ }} escapes
+    resolved); variable slots are 1-tuples holding the variable name.
+    Rendering is then a single str.join with no format-spec parsing.
+    """
+    pattern = re.compile("|".join(r"\{%s\}" % re.escape(v) for v in variables))
+    parts = []
+    pos = 0
+    for match in pattern.finditer(template):
+        parts.append(template[pos : match.start()].replace("{{", "{").replace("}}", "}"))
+        parts.append((match.group(0)[1:-1],))
+        pos = match.end()
+    parts.append(template[pos:].replace("{{", "{").replace("}}", "}"))
+    return parts
+
+
+def _render(parts: List, values: dict) -> str:
+    """Join pre-split template segments with the given variable values"""
+    return "".join(
+        values[part[0]] if isinstance(part, tuple) else part for part in parts
+    )
+
+
+def _fast_parse_dt(s: str):
+    """Parse a "%Y-%m-%d %H:%M:%S" timestamp by slicing.
+
+    Avoids strptime's per-call format parsing (10-20x faster), which adds
+    up when importing thousands of activities. Returns None on malformed
+    input, matching the old ValueError fallback.
+    """
+    try:
+        return datetime(
+            int(s[0:4]),
+            int(s[5:7]),
+            int(s[8:10]),
+            int(s[11:13]),
+            int(s[14:16]),
+            int(s[17:19]),
+        )
+    except (ValueError, TypeError, IndexError):
+        return None
+
 
 class LLMClient:
     def __init__(self, api_key: str, model_name: str, embed_model: str):
         self.llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=api_key)
+
+        # Dedicated JSON-mode model for query interpretation - Gemini
+        # guarantees pure JSON output so no fence stripping or reparse
+        # retries are needed
+        self.json_llm = ChatGoogleGenerativeAI(
+            model=model_name,
+            google_api_key=api_key,
+            response_mime_type="application/json",
+        )
         self.embeddings = GoogleGenerativeAIEmbeddings(
             model=embed_model, google_api_key=api_key
         )
 
+        # Two-tier response cache (exact + semantic) shared by all invoke sites
+        self.cache = LLMCache(model_name, embeddings=self.embeddings)
+
+        # Reusable SIMD JSON parser (one tape allocation across calls);
+        # None when pysimdjson isn't installed
+        self._parser = simdjson.Parser() if simdjson else None
+
+        # Pacing for concurrent summarization (requests per minute budget)
+        self._request_interval = 60.0 / 60  # 60 RPM
+        self._rate_lock = None
+        self._next_request_at = 0.0
+
         # Prompt for converting JSON to text documents
-        self.summary_prompt = PromptTemplate(
-            input_variables=["json_data"],
-            template=r"""
+        self.summary_prompt = r"""
 You are a sports activity summarizer. Your only task is to convert the given running activity JSON
 into a **clear, verbose, factual, and precise** human-readable summary.
 
@@ -45,13 +118,10 @@ KM 1: Pace 8.725 min/km, HR 146.248 bpm, Power 170 W, Elevation Gain 2.2 m
 KM 2: Pace 7.909 min/km, HR 166.694 bpm, Power 165 W, Elevation Gain 2.6 m
 
 Output the final result as plain text with exact formatting as mentioned here.
-""",
-        )
+"""
 
         # Prompt for query interpretation
-        self.interpreter_prompt = PromptTemplate(
-            input_variables=["user_text"],
-            template=r"""
+        self.interpreter_prompt = r"""
 You are an expert sports data interpreter. Your task is to convert a user's natural language query
 about their running activities into a **strict JSON object** matching this schema:
 
@@ -64,7 +134,8 @@ about their running activities into a **strict JSON object** matching this schem
   "last_n_runs": int or null,
   "distance_km": float or null,
   "metric_filter": str or null,
-  "run_names": list or null # List of specific run names to find (e.g., ["Tempo Run - 1", "Tempo Run - 2"])
+  "run_names": list or null, # List of specific run names to find (e.g., ["Tempo Run - 1", "Tempo Run - 2"])
+  "wants_plot": bool # true when a chart/visualization would help answer the query
 }}
 
 Rules:
@@ -77,18 +148,16 @@ Rules:
 - For run names, use the exact format that appears in Strava (e.g., "Tempo Run - 1" not "Tempo Run 1").
 - When user asks for "Tempo Run 1 and 2", interpret as ["Tempo Run - 1", "Tempo Run - 2"] (with dashes).
 - When user asks for "Easy Run 5", interpret as ["Easy Run - 5"] (with dash).
+- Set wants_plot to true for questions about trends, comparisons or progress (e.g., "am I getting faster?"), and false for purely textual asks like training plans or advice.
 
 User Query:
 "{user_text}"
 
 Output JSON:
-""",
-        )
+"""
 
         # Prompt for coach responses
-        self.coach_prompt = PromptTemplate(
-            input_variables=["run_data", "question", "chat_context"],
-            template="""
+        self.coach_prompt = """
 You are a Strava analytics assistant and my personal running coach. Give concise, actionable insights based on the questions asked.
 If a user asks for a plan, use your own knowledge and experience as a personal coach to 
 analyse user's existing run data and create a plan. Make sure it is logical and achievable.
@@ -114,13 +183,10 @@ IMPORTANT GUIDELINES:
 - If the response would be too long, prioritize the most important points
 
 Provide actionable insights and recommendations based on the data.
-""",
-        )
+"""
 
         # Prompt for plotting
-        self.plotting_prompt = PromptTemplate(
-            input_variables=["df_description", "user_question", "llm_response"],
-            template="""
+        self.plotting_prompt = """
 You are an AI Strava Visualisation assistant. Your aim is to generate plots for the relevant user questions.
 The schema of the dataframe supplied to you is as follows:
 {df_description}
@@ -148,74 +214,175 @@ Instructions for generating code:
 - Create plots that can be saved with plt.savefig().
 - Handle errors gracefully with try-except blocks instead of exiting.
 - If no data is found, create an informative plot message instead of exiting.
-""",
+"""
+
+        # Templates pre-split around their placeholders - rendering a
+        # prompt is a join of interned static segments, which matters most
+        # for the multi-KB plotting template with three short variables
+        self._summary_parts = _split_on_placeholders(self.summary_prompt, ["json_data"])
+        self._interpreter_parts = _split_on_placeholders(
+            self.interpreter_prompt, ["user_text"]
+        )
+        self._coach_parts = _split_on_placeholders(
+            self.coach_prompt, ["run_data", "question", "chat_context"]
+        )
+        self._plotting_parts = _split_on_placeholders(
+            self.plotting_prompt, ["df_description", "user_question", "llm_response"]
         )
 
+    def _invoke_cached(
+        self, prompt_text: str, semantic_text: str = None, llm=None
+    ) -> str:
+        """Invoke the LLM with cache lookup around the call.
+
+        Exact prompts are served from the L1 cache; when semantic_text is
+        given, near-identical user queries can also be served from the
+        semantic tier without hitting Gemini.
+        """
+        cached = self.cache.get(prompt_text, semantic_text=semantic_text)
+        if cached is not None:
+            return cached
+
+        response = (llm or self.llm).invoke(prompt_text).content
+        self.cache.set(prompt_text, response, semantic_text=semantic_text)
+        return response
+
+    def _parse_run_json(self, run_json: str) -> dict:
+        """Parse a run JSON blob and extract the first (and only) run object"""
+        if self._parser is not None:
+            try:
+                return self._parser.parse(run_json.encode()).at_pointer("/0").as_dict()
+            except ValueError:
+                pass  # fall back to stdlib json below
+        return json.loads(run_json)[0]
+
+    async def _summarize_one(
+        self, run_json: str, sem: asyncio.Semaphore, max_retries: int = 3
+    ) -> str:
+        """Summarize a single run JSON, with backoff on rate limits"""
+        prompt_text = _render(self._summary_parts, {"json_data": run_json})
+
+        cached = self.cache.get(prompt_text)
+        if cached is not None:
+            return cached
+
+        async with sem:
+            # Proactive pacing so concurrent tasks stay under the RPM budget
+            async with self._rate_lock:
+                now = asyncio.get_running_loop().time()
+                wait = self._next_request_at - now
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                self._next_request_at = (
+                    max(now, self._next_request_at) + self._request_interval
+                )
+
+            wait_time = 10
+            for attempt in range(max_retries + 1):
+                try:
+                    response = await self.llm.ainvoke(prompt_text)
+                    summary = response.content
+                    self.cache.set(prompt_text, summary)
+                    return summary
+                except Exception as e:
+                    rate_limited = "429" in str(e) or "quota" in str(e).lower()
+                    if rate_limited and attempt < max_retries:
+                        # Back off only this task, exponentially
+                        print(f"⚠️ Rate limited, waiting {wait_time} seconds...")
+                        await asyncio.sleep(wait_time)
+                        wait_time *= 2
+                    else:
+                        raise e
+
+    async def _summarize_all(self, json_list: List[str]) -> List[str]:
+        """Fan out run summaries with bounded concurrency, preserving order"""
+        sem = asyncio.Semaphore(8)
+        self._rate_lock = asyncio.Lock()
+        self._next_request_at = 0.0
+        tasks = [self._summarize_one(run_json, sem) for run_json in json_list]
+        return await asyncio.gather(*tasks, return_exceptions=True)
+
     def create_documents(self, json_list: List[str]) -> List[Document]:
         """Convert JSON list to Document objects with rich metadata"""
         docs = []
 
-        for i, run_json in enumerate(json_list):
-            run_data = json.loads(run_json)[0]  # extract first (and only) run object
-
-            # Generate the run summary text
-            prompt_text = self.summary_prompt.format(json_data=run_json)
+        if not json_list:
+            return docs
 
-            try:
-                summary = self.llm.invoke(prompt_text).content
-            except Exception as e:
-                if "429" in str(e) or "quota" in str(e).lower():
-                    # Rate limited - wait and retry
-                    import time
-
-                    wait_time = 60  # Wait 1 minute
-                    print(f"⚠️ Rate limited, waiting {wait_time} seconds...")
-                    time.sleep(wait_time)
-                    summary = self.llm.invoke(prompt_text).content
-                else:
-                    raise e
+        # Summarize all runs concurrently instead of serial invoke + sleep
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            summaries = asyncio.run(self._summarize_all(json_list))
+        else:
+            # Already inside an event loop (e.g. Telegram handler) -
+            # run the gather on its own loop in a worker thread
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                summaries = executor.submit(
+                    asyncio.run, self._summarize_all(json_list)
+                ).result()
+
+        for run_json, summary in zip(json_list, summaries):
+            if isinstance(summary, Exception):
+                raise summary
+
+            run_data = self._parse_run_json(run_json)
 
             # Build rich metadata
-            try:
-                run_date = datetime.strptime(run_data["DateTime"], "%Y-%m-%d %H:%M:%S")
-            except ValueError:
-                run_date = None
+            rd = run_data
+            date_str = rd.get("DateTime")
+            run_date = _fast_parse_dt(date_str or "")
+
+            # Look up shared fields once instead of hashing the same keys twice
+            name = rd.get("Name", "Unknown Run")
+            iso_week = run_date.isocalendar()[1] if run_date else None
 
             metadata = {
-                "source": run_data.get("Name", "Unknown Run"),
-                "name": run_data.get("Name", "Unknown Run"),
-                "type": run_data.get("Run_Type", "Unknown Type"),
-                "distance": run_data.get("Distance", None),
-                "date": run_data.get("DateTime", None),
+                "source": name,
+                "name": name,
+                "type": rd.get("Run_Type", "Unknown Type"),
+                "distance": rd.get("Distance", None),
+                "date": date_str,
                 "year": run_date.year if run_date else None,
                 "month": run_date.month if run_date else None,
-                "week": run_date.isocalendar()[1] if run_date else None,
-                "pace": run_data.get("Avg_Pace"),
-                "avg_hr": run_data.get("Avg_HR"),
-                "avg_cadence": run_data.get("Avg_Cadence"),
-                "avg_power": run_data.get("Avg_Power"),
-                "elevation_gain": run_data.get("Elevation_Gain_m"),
+                "week": iso_week,
+                "pace": rd.get("Avg_Pace"),
+                "avg_hr": rd.get("Avg_HR"),
+                "avg_cadence": rd.get("Avg_Cadence"),
+                "avg_power": rd.get("Avg_Power"),
+                "elevation_gain": rd.get("Elevation_Gain_m"),
             }
 
             docs.append(Document(page_content=summary.strip(), metadata=metadata))
 
-            # Add delay between requests to avoid rate limiting
-            if i < len(json_list) - 1:  # Don't delay after the last one
-                import time
-
-                time.sleep(2)  # 2 second delay between requests
-
         return docs
 
     def interpret_query(self, user_text: str) -> dict:
         """Convert user text to structured query"""
-        prompt_text = self.interpreter_prompt.format(user_text=user_text)
-        response = self.llm.invoke(prompt_text).content.strip()
+        prompt_text = _render(self._interpreter_parts, {"user_text": user_text})
+        response = self._invoke_cached(
+            prompt_text, semantic_text=user_text, llm=self.json_llm
+        ).strip()
+
+        # Parse JSON safely
+        try:
+            query_dict = json.loads(response)
+        except json.JSONDecodeError:
+            raise ValueError(f"Failed to parse Gemini output as JSON:\n{response}")
+
+        return query_dict
+
+    async def ainterpret_query(self, user_text: str) -> dict:
+        """Async variant of interpret_query for non-blocking workflow nodes"""
+        prompt_text = _render(self._interpreter_parts, {"user_text": user_text})
 
-        # Remove any markdown / ```json fences
-        import re
+        cached = self.cache.get(prompt_text, semantic_text=user_text)
+        if cached is None:
+            response = await self.json_llm.ainvoke(prompt_text)
+            cached = response.content
+            self.cache.set(prompt_text, cached, semantic_text=user_text)
 
-        response = re.sub(r"^```json\s*|```$", "", response, flags=re.MULTILINE).strip()
+        response = cached.strip()
 
         # Parse JSON safely
         try:
@@ -225,27 +392,103 @@ Instructions for generating code:
 
         return query_dict
 
+    @staticmethod
+    def _context_namespace(run_data: str) -> str:
+        """Hash of the retrieved context, used to partition the semantic
+        cache so similar questions over different runs never collide"""
+        return hashlib.blake2b(run_data.encode()).hexdigest()[:16]
+
     def get_coach_response(
         self, run_data: str, question: str, chat_context: str = ""
     ) -> str:
         """Get coaching response based on run data and question"""
-        prompt_text = self.coach_prompt.format(
-            run_data=run_data, question=question, chat_context=chat_context
+        prompt_text = _render(
+            self._coach_parts,
+            {"run_data": run_data, "question": question, "chat_context": chat_context},
+        )
+        namespace = self._context_namespace(run_data)
+
+        cached = self.cache.get(prompt_text, semantic_text=question, namespace=namespace)
+        if cached is not None:
+            return cached
+
+        response = self.llm.invoke(prompt_text).content
+        self.cache.set(
+            prompt_text, response, semantic_text=question, namespace=namespace
+        )
+        return response
+
+    async def aget_coach_response(
+        self, run_data: str, question: str, chat_context: str = ""
+    ) -> AsyncIterator[str]:
+        """Stream the coaching response chunk by chunk.
+
+        Time-to-first-token drops to well under a second; callers can
+        forward chunks to the user (e.g. via Telegram edit_message_text)
+        instead of blocking on the full response. The assembled response
+        is cached like the sync path.
+        """
+        prompt_text = _render(
+            self._coach_parts,
+            {"run_data": run_data, "question": question, "chat_context": chat_context},
+        )
+        namespace = self._context_namespace(run_data)
+
+        cached = self.cache.get(prompt_text, semantic_text=question, namespace=namespace)
+        if cached is not None:
+            yield cached
+            return
+
+        chunks = []
+        async for chunk in self.llm.astream(prompt_text):
+            if chunk.content:
+                chunks.append(chunk.content)
+                yield chunk.content
+
+        self.cache.set(
+            prompt_text, "".join(chunks), semantic_text=question, namespace=namespace
         )
-        response = self.llm.invoke(prompt_text)
-        return response.content
 
     def get_plotting_code(
         self, df_description: str, user_question: str, llm_response: str
     ) -> str:
         """Get plotting code from LLM"""
-        prompt_text = self.plotting_prompt.format(
-            df_description=df_description,
-            user_question=user_question,
-            llm_response=llm_response,
+        prompt_text = _render(
+            self._plotting_parts,
+            {
+                "df_description": df_description,
+                "user_question": user_question,
+                "llm_response": llm_response,
+            },
+        )
+        ai_code = self._invoke_cached(prompt_text).strip()
+
+        # Clean up the code
+        if ai_code.startswith("```"):
+            ai_code = "\n".join(ai_code.splitlines()[1:-1])
+
+        return ai_code
+
+    async def aget_plotting_code(
+        self, df_description: str, user_question: str, llm_response: str
+    ) -> str:
+        """Async variant of get_plotting_code that doesn't block the event loop"""
+        prompt_text = _render(
+            self._plotting_parts,
+            {
+                "df_description": df_description,
+                "user_question": user_question,
+                "llm_response": llm_response,
+            },
         )
-        response = self.llm.invoke(prompt_text)
-        ai_code = response.content.strip()
+
+        cached = self.cache.get(prompt_text)
+        if cached is None:
+            response = await self.llm.ainvoke(prompt_text)
+            cached = response.content
+            self.cache.set(prompt_text, cached)
+
+        ai_code = cached.strip()
 
         # Clean up the code
         if ai_code.startswith("```"):
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import os
+import sqlite3
+from typing import List
+
+
+class CachedEmbeddings:
+    """Wrap an embeddings model with a persistent content-hash cache.
+
+    Re-syncing Strava data re-embeds run documents whose text hasn't
+    changed. Keying vectors by a hash of the text means only genuinely
+    new or changed runs pay the embedding API round trip.
+    """
+
+    def __init__(self, embeddings, db_path: str):
+        self.embeddings = embeddings
+        self.db_path = db_path
+
+        # Ensure the parent directory exists (per-user chroma store dir)
+        parent = os.path.dirname(db_path)
+        if parent and not os.path.exists(parent):
+            os.makedirs(parent)
+
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embed_cache ("
+                "key TEXT PRIMARY KEY, vector TEXT)"
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _key(text: str) -> str:
+        """Short blake2b digest of the document text"""
+        return hashlib.blake2b(text.encode()).hexdigest()[:16]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts, serving unchanged ones from the cache"""
+        if not texts:
+            return []
+
+        keys = [self._key(text) for text in texts]
+        vectors = [None] * len(texts)
+
+        try:
+            conn = sqlite3.connect(self.db_path)
+            try:
+                for i, key in enumerate(keys):
+                    row = conn.execute(
+                        "SELECT vector FROM embed_cache WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row:
+                        vectors[i] = json.loads(row[0])
+
+                # Embed only the uncached subset in one call
+                miss_indices = [i for i, vec in enumerate(vectors) if vec is None]
+                if miss_indices:
+                    new_vectors = self.embeddings.embed_documents(
+                        [texts[i] for i in miss_indices]
+                    )
+                    for i, vec in zip(miss_indices, new_vectors):
+                        vectors[i] = vec
+                        conn.execute(
+                            "INSERT OR REPLACE INTO embed_cache (key, vector) "
+                            "VALUES (?, ?)",
+                            (keys[i], json.dumps(vec)),
+                        )
+                    conn.commit()
+            finally:
+                conn.close()
+        except Exception as e:
+            print(f"⚠️ Embedding cache failed: {e}")
+            return self.embeddings.embed_documents(texts)
+
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """Queries are ad-hoc, so pass straight through"""
+        return self.embeddings.embed_query(text)
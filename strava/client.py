@@ -1,12 +1,74 @@
 import requests
+import random
+import re
+import tempfile
+import threading
 import time
-import pandas as pd
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import List, Dict, Any
 import json
 import os
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Global refresh-token line in .env, compiled once for the fallback path
+_ENV_TOKEN_RE = re.compile(r"^STRAVA_REFRESH_TOKEN=.*$", re.MULTILINE)
+
+# Stream responses are immutable once an activity is uploaded, so they
+# are cached on disk and never refetched. The version segment tracks the
+# Strava API version so a bump invalidates the whole cache.
+_STREAMS_CACHE_DIR = os.path.join(
+    os.path.expanduser("~"), ".cache", "strava_agent", "streams", "v3"
+)
+
+
+class _TokenBucket:
+    """Client-side rate limiter sized to one Strava quota window.
+
+    Tokens refill continuously at refill_rate per second up to capacity;
+    acquire sleeps only as long as the next token takes to arrive. That
+    lets bursts run at full speed while quota is free, unlike the fixed
+    per-activity sleeps fetch_all_runs used to take.
+    """
+
+    def __init__(self, capacity: float, refill_rate: float):
+        self.capacity = capacity
+        self.refill_rate = refill_rate
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+        # acquire() is called from the fetch_all_runs worker threads
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity,
+                    self.tokens + (now - self.last_refill) * self.refill_rate,
+                )
+                self.last_refill = now
+
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.refill_rate
+
+            # Sleep outside the lock so a drained bucket doesn't block
+            # other threads from checking it, then re-contend for the
+            # refilled token
+            time.sleep(wait)
+
 
 class StravaClient:
     def __init__(
@@ -23,6 +85,26 @@ class StravaClient:
         self.access_token = None
         self.token_expires_at = None
 
+        # One session for the client's lifetime: keep-alive and pooled
+        # connections save a TCP + TLS handshake on every call, which
+        # adds up fast when fetch_all_runs makes one streams request per
+        # activity. The Authorization header lives on the session and is
+        # rewritten on token refresh instead of rebuilt per request.
+        self._session = requests.Session()
+        self._session.mount(
+            "https://",
+            requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8),
+        )
+
+        # Strava's documented limits: 100 requests / 15 min, 1000 / day.
+        # Every HTTP call consumes one token from each bucket.
+        self._bucket_short = _TokenBucket(capacity=100, refill_rate=100 / 900)
+        self._bucket_day = _TokenBucket(capacity=1000, refill_rate=1000 / 86400)
+        # Serializes token refresh across fetch threads; a concurrent
+        # double-refresh would rotate the refresh token twice and leave
+        # one thread holding a revoked one
+        self._refresh_lock = threading.Lock()
+
         # Initialize token manager for persistent storage
         if user_id:
             from utils.token_manager import TokenManager
@@ -31,6 +113,71 @@ class StravaClient:
         else:
             self.token_manager = None
 
+    # Retry policy for throttled/failing Strava calls
+    _MAX_RETRIES = 5
+    _BACKOFF_BASE = 1.0  # seconds
+    _BACKOFF_CAP = 30.0
+    _BACKOFF_JITTER = 0.5
+
+    def _request(self, method: str, url: str, **kwargs) -> requests.Response:
+        """Session request with backoff on 429/5xx.
+
+        Honors Strava's Retry-After header when present (often just
+        seconds), otherwise sleeps base * 2^attempt with jitter, capped
+        at 30s. Raises once retries are exhausted - no flat 15-minute
+        sleep and no recursion. The token refresh call itself opts out
+        of ensure_token, since it is how tokens get refreshed.
+        """
+        ensure_token = kwargs.pop("ensure_token", True)
+        response = None
+        for attempt in range(self._MAX_RETRIES):
+            if ensure_token:
+                self._ensure_token()
+            self._bucket_short.acquire()
+            self._bucket_day.acquire()
+            response = self._session.request(method, url, timeout=(5, 30), **kwargs)
+            if response.status_code != 429 and response.status_code < 500:
+                return response
+            if attempt == self._MAX_RETRIES - 1:
+                break
+
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                delay = float(retry_after)
+            else:
+                delay = min(
+                    self._BACKOFF_CAP, self._BACKOFF_BASE * 2**attempt
+                ) * (1 + random.random() * self._BACKOFF_JITTER)
+            print(
+                f"⚠️ Strava returned {response.status_code}; retrying in {delay:.1f}s..."
+            )
+            time.sleep(delay)
+
+        response.raise_for_status()
+        return response
+
+    @staticmethod
+    def _parse_json(response: requests.Response):
+        """Decode a JSON response body, via orjson when available.
+
+        Stream payloads run to multiple MB of per-second arrays; orjson
+        parses those a few times faster than the stdlib decoder behind
+        response.json().
+        """
+        if orjson is not None:
+            return orjson.loads(response.content)
+        return response.json()
+
+    def close(self):
+        """Release the pooled HTTP connections"""
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def refresh_access_token(self) -> str:
         """Refresh the access token using refresh token"""
         url = "https://www.strava.com/oauth/token"
@@ -41,13 +188,14 @@ class StravaClient:
             "grant_type": "refresh_token",
         }
 
-        response = requests.post(url, data=payload)
+        response = self._request("POST", url, data=payload, ensure_token=False)
         response.raise_for_status()
-        data = response.json()
+        data = self._parse_json(response)
 
         self.access_token = data["access_token"]
         new_refresh_token = data["refresh_token"]  # Get new refresh token
         self.token_expires_at = data["expires_at"]
+        self._session.headers["Authorization"] = f"Bearer {self.access_token}"
 
         # Update the refresh token in memory
         self.refresh_token = new_refresh_token
@@ -71,32 +219,38 @@ class StravaClient:
         return self.access_token
 
     def _update_env_refresh_token(self, new_refresh_token: str):
-        """Update the global refresh token in the .env file (fallback method)"""
+        """Update the global refresh token in the .env file (fallback method).
+
+        Single regex substitution over one read, written to a temp file
+        and renamed into place so a crash mid-write can't leave a
+        half-written .env.
+        """
         try:
-            # Read the current .env file
             env_path = ".env"
             if not os.path.exists(env_path):
                 print("⚠️ .env file not found, cannot update refresh token")
                 return
 
             with open(env_path, "r") as file:
-                lines = file.readlines()
-
-            # Find and update the STRAVA_REFRESH_TOKEN line
-            updated = False
-            for i, line in enumerate(lines):
-                if line.startswith("STRAVA_REFRESH_TOKEN="):
-                    lines[i] = f"STRAVA_REFRESH_TOKEN={new_refresh_token}\n"
-                    updated = True
-                    break
+                content = file.read()
 
-            if not updated:
+            content, replaced = _ENV_TOKEN_RE.subn(
+                f"STRAVA_REFRESH_TOKEN={new_refresh_token}", content, count=1
+            )
+            if not replaced:
                 print("⚠️ STRAVA_REFRESH_TOKEN not found in .env file")
                 return
 
-            # Write the updated .env file
-            with open(env_path, "w") as file:
-                file.writelines(lines)
+            env_dir = os.path.dirname(env_path) or "."
+            fd, tmp_path = tempfile.mkstemp(dir=env_dir, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as file:
+                    file.write(content)
+                os.replace(tmp_path, env_path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
 
             print(f"✅ Global refresh token updated in .env file")
 
@@ -104,45 +258,102 @@ class StravaClient:
             print(f"❌ Error updating refresh token in .env: {e}")
             # Don't fail the token refresh if .env update fails
 
+    def _token_stale(self) -> bool:
+        # The 60s margin keeps a token from expiring mid-request
+        return not self.access_token or (
+            self.token_expires_at and time.time() >= self.token_expires_at - 60
+        )
+
+    def _ensure_token(self):
+        """Refresh the access token shortly before it expires.
+
+        The Authorization header lives on the session, so on the hot
+        path this is a single time comparison - no header dict is built
+        per call.
+        """
+        if not self._token_stale():
+            return
+        with self._refresh_lock:
+            # Another thread may have refreshed while this one waited
+            if self._token_stale():
+                self.refresh_access_token()
+
     def get_access_token(self) -> str:
         """Get valid access token, refreshing if necessary"""
-        if not self.access_token or (
-            self.token_expires_at and time.time() >= self.token_expires_at
-        ):
-            return self.refresh_access_token()
+        self._ensure_token()
         return self.access_token
 
-    def get_activities(self, page: int = 1, per_page: int = 30) -> List[Dict[str, Any]]:
-        """Get activities from Strava"""
+    def get_activities(
+        self, page: int = 1, per_page: int = 30, after: datetime = None
+    ) -> List[Dict[str, Any]]:
+        """Get activities from Strava, optionally only those after a time"""
         url = "https://www.strava.com/api/v3/athlete/activities"
-        headers = {"Authorization": f"Bearer {self.get_access_token()}"}
         params = {"per_page": per_page, "page": page}
+        if after is not None:
+            params["after"] = int(after.timestamp())
 
-        response = requests.get(url, headers=headers, params=params)
+        response = self._request("GET", url, params=params)
+        response.raise_for_status()
+        return self._parse_json(response)
 
-        if response.status_code == 429:
-            print("⚠️ Rate limit hit. Waiting 15 minutes...")
-            time.sleep(15 * 60)
-            return self.get_activities(page, per_page)
+    @staticmethod
+    def _stream_cache_path(activity_id: int) -> str:
+        ext = ".json.zst" if zstandard is not None else ".json"
+        return os.path.join(_STREAMS_CACHE_DIR, f"{activity_id}{ext}")
 
-        response.raise_for_status()
-        return response.json()
+    def _read_cached_streams(self, activity_id: int):
+        """Cached stream data for an activity, or None on a miss"""
+        try:
+            with open(self._stream_cache_path(activity_id), "rb") as file:
+                raw = file.read()
+            if zstandard is not None:
+                raw = zstandard.ZstdDecompressor().decompress(raw)
+            return orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except OSError:
+            return None
+        except Exception as e:
+            print(f"⚠️ Ignoring unreadable stream cache for {activity_id}: {e}")
+            return None
+
+    def _write_cached_streams(self, activity_id: int, data: Dict[str, Any]):
+        """Persist stream data for an activity (tmp file + rename)"""
+        try:
+            os.makedirs(_STREAMS_CACHE_DIR, exist_ok=True)
+            payload = (
+                orjson.dumps(data)
+                if orjson is not None
+                else json.dumps(data).encode()
+            )
+            if zstandard is not None:
+                # Level 3 shrinks these float arrays 3-5x at little cost
+                payload = zstandard.ZstdCompressor(level=3).compress(payload)
+
+            fd, tmp_path = tempfile.mkstemp(dir=_STREAMS_CACHE_DIR, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as file:
+                    file.write(payload)
+                os.replace(tmp_path, self._stream_cache_path(activity_id))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+        except Exception as e:
+            # A failed cache write shouldn't fail the fetch
+            print(f"⚠️ Could not cache streams for {activity_id}: {e}")
 
     def get_activity_streams(self, activity_id: int) -> Dict[str, Any]:
         """Get detailed streams for an activity"""
+        cached = self._read_cached_streams(activity_id)
+        if cached is not None:
+            return cached
+
         url = f"https://www.strava.com/api/v3/activities/{activity_id}/streams"
-        headers = {"Authorization": f"Bearer {self.get_access_token()}"}
         params = {
             "keys": "distance,heartrate,cadence,watts,velocity_smooth,altitude",
             "key_by_type": "true",
         }
 
-        response = requests.get(url, headers=headers, params=params)
-
-        if response.status_code == 429:
-            print("⚠️ Rate limit hit. Waiting 15 minutes...")
-            time.sleep(15 * 60)
-            return self.get_activity_streams(activity_id)
+        response = self._request("GET", url, params=params)
 
         # Handle 404 errors gracefully (manual runs don't have stream data)
         if response.status_code == 404:
@@ -158,20 +369,49 @@ class StravaClient:
             )
             return {}
 
-        return response.json()
+        data = self._parse_json(response)
+        self._write_cached_streams(activity_id, data)
+        return data
 
     def safe_array(self, data: List) -> np.ndarray:
         """Convert a list to a numpy array, replace None with np.nan."""
         if not data:
             return np.array([])
-        return np.array([np.nan if v is None else v for v in data], dtype=float)
+        try:
+            # NumPy's float cast already maps None to nan, so the whole
+            # conversion happens in C with no intermediate Python list
+            return np.asarray(data, dtype=np.float64)
+        except (TypeError, ValueError):
+            # Mixed payloads fall back to masking the None entries over
+            # an object array - still no per-element Python branch
+            arr = np.array(data, dtype=object)
+            mask = np.frompyfunc(lambda v: v is None, 1, 1)(arr).astype(bool)
+            out = np.full(arr.shape, np.nan)
+            out[~mask] = arr[~mask].astype(np.float64)
+            return out
+
+    @staticmethod
+    def _extract_run_type(name: str) -> str:
+        """Run type prefix of an activity name ("Long Run" -> "Long").
+
+        maxsplit=1 stops scanning at the first match; the type is a
+        property of the activity, computed once per record.
+        """
+        return name.split(" Run", 1)[0]
+
+    @staticmethod
+    def _clean(value, digits: int = 2):
+        """Round a float for JSON output, mapping NaN/None to None"""
+        if value is None or np.isnan(value):
+            return None
+        return float(round(value, digits))
 
-    def km_wise_data(self, streams: Dict[str, Any]) -> pd.DataFrame:
-        """Convert activity streams to per-kilometer data"""
+    def km_wise_splits(self, streams: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Convert activity streams to per-kilometer split dicts"""
         # Check if we have any stream data
         if not streams:
             print("⚠️ No stream data available - creating fallback data structure")
-            return pd.DataFrame()
+            return []
 
         dist = self.safe_array(streams.get("distance", {}).get("data", []))
         hr = self.safe_array(streams.get("heartrate", {}).get("data", []))
@@ -181,185 +421,251 @@ class StravaClient:
         alt = self.safe_array(streams.get("altitude", {}).get("data", []))
 
         if dist.size == 0:
-            return pd.DataFrame()
+            return []
 
         km_segments = int(dist[-1] // 1000)
-        rows = []
+        if km_segments <= 0:
+            return []
+
+        # Bucketize every sample into its kilometer once instead of
+        # recomputing an O(N) boolean mask per kilometer; each per-km
+        # mean then falls out of two bincount passes over the whole
+        # stream. Samples past the last full kilometer are dropped, as
+        # the old range masks did.
+        # NaN distance samples (GPS dropouts) would turn into garbage
+        # negative indices in the int cast and crash bincount; map them
+        # to -1 and range-check both ends, as the old per-km range masks
+        # excluded them implicitly
+        km_idx = dist // 1000
+        km_idx = np.where(np.isnan(km_idx), -1, km_idx).astype(np.int64)
+        in_range = (km_idx >= 0) & (km_idx < km_segments)
+        km_idx = km_idx[in_range]
+        counts = np.bincount(km_idx, minlength=km_segments)
+
+        def bucket_means(values: np.ndarray):
+            """Per-km nanmean of a stream; NaN where a km has no data"""
+            if values.size == 0:
+                return None
+            vals = values[in_range]
+            valid = ~np.isnan(vals)
+            idx = km_idx[valid]
+            n = np.bincount(idx, minlength=km_segments)
+            s = np.bincount(idx, weights=vals[valid], minlength=km_segments)
+            return np.divide(
+                s, n, out=np.full(km_segments, np.nan), where=n > 0
+            )
 
-        for km in range(1, km_segments + 1):
-            mask = (dist >= (km - 1) * 1000) & (dist < km * 1000)
-            if mask.sum() == 0:
+        hr_mean = bucket_means(hr)
+        cad_mean = bucket_means(cad)
+        watts_mean = bucket_means(watts)
+        pace_mean = bucket_means(pace)
+
+        elev_gain = None
+        if alt.size:
+            alt_r = alt[in_range]
+            valid = ~np.isnan(alt_r)
+            idx = km_idx[valid]
+            alt_min = np.full(km_segments, np.inf)
+            alt_max = np.full(km_segments, -np.inf)
+            np.minimum.at(alt_min, idx, alt_r[valid])
+            np.maximum.at(alt_max, idx, alt_r[valid])
+            elev_gain = alt_max - alt_min
+            elev_gain[~np.isfinite(elev_gain)] = np.nan
+
+        # Round whole columns at once so the remaining per-km work is
+        # plain dict assembly with no numeric calls left in the loop
+        hr_mean = np.round(hr_mean, 2) if hr_mean is not None else None
+        cad_mean = np.round(cad_mean, 2) if cad_mean is not None else None
+        watts_mean = np.round(watts_mean, 2) if watts_mean is not None else None
+        pace_mean = (
+            np.round((1000 / pace_mean) / 60, 2) if pace_mean is not None else None
+        )
+        elev_gain = np.round(elev_gain, 1) if elev_gain is not None else None
+
+        def cell(values, km: int):
+            """Python float from a rounded column, NaN/absent -> None"""
+            if values is None:
+                return None
+            value = values[km]
+            return None if np.isnan(value) else float(value)
+
+        splits = []
+        for km in range(km_segments):
+            if counts[km] == 0:
                 continue
 
-            rows.append(
+            elevation = cell(elev_gain, km)
+            splits.append(
                 {
-                    "KM": km,
-                    "Avg_HR": np.nanmean(hr[mask]) if hr.size else None,
-                    "Avg_Cadence": np.nanmean(cad[mask]) if cad.size else None,
-                    "Avg_Power": np.nanmean(watts[mask]) if watts.size else None,
-                    "Avg_Pace_min_per_km": (1000 / np.nanmean(pace[mask])) / 60
-                    if pace.size
-                    else None,
-                    "Elevation_Gain_m": np.nanmax(alt[mask]) - np.nanmin(alt[mask])
-                    if alt.size
-                    else None,
+                    "KM": km + 1,
+                    "Avg_HR": cell(hr_mean, km),
+                    "Avg_Cadence": cell(cad_mean, km),
+                    "Avg_Power": cell(watts_mean, km),
+                    "Avg_Pace_min_per_km": cell(pace_mean, km),
+                    "Elevation_Gain_m": elevation if elevation is not None else 0.0,
                 }
             )
 
-        return pd.DataFrame(rows)
+        return splits
+
+    def build_run_record(
+        self, activity: Dict[str, Any], splits: List[Dict[str, Any]]
+    ) -> Dict[str, Any]:
+        """Aggregate per-km splits into the final JSON record shape"""
+        name = activity["name"]
+
+        # One pass over the splits accumulates every activity-level
+        # aggregate, instead of one scan per metric
+        mean_keys = ("Avg_HR", "Avg_Pace_min_per_km", "Avg_Cadence", "Avg_Power")
+        sums = dict.fromkeys(mean_keys, 0.0)
+        counts = dict.fromkeys(mean_keys, 0)
+        total_elevation = 0.0
+        max_km = 0
+        for split in splits:
+            for key in mean_keys:
+                value = split[key]
+                if value is not None:
+                    sums[key] += value
+                    counts[key] += 1
+            total_elevation += split["Elevation_Gain_m"] or 0.0
+            if split["KM"] > max_km:
+                max_km = split["KM"]
+
+        def mean_of(key):
+            if not counts[key]:
+                return None
+            return float(round(sums[key] / counts[key], 2))
+
+        return {
+            "Name": name,
+            "DateTime": activity["start_date_local"][:19].replace("T", " "),
+            "Distance": float(max_km),
+            "Run_Type": self._extract_run_type(name),
+            "Avg_HR": mean_of("Avg_HR"),
+            "Avg_Pace": mean_of("Avg_Pace_min_per_km"),
+            "Avg_Cadence": mean_of("Avg_Cadence"),
+            "Avg_Power": mean_of("Avg_Power"),
+            "Elevation_Gain_m": float(round(total_elevation, 1)),
+            "Splits": splits,
+        }
+
+    def _fetch_one(self, activity: Dict[str, Any]) -> Dict[str, Any]:
+        """Fetch streams for one activity and build its run record"""
+        try:
+            # Manual entries have no streams at all - the listing already
+            # says so, so don't spend a round trip and a rate-limit token
+            # on the guaranteed 404
+            if activity.get("manual"):
+                print(f"📝 Creating fallback data for manual run: {activity['name']}")
+                return self.create_fallback_record(activity)
+
+            streams = self.get_activity_streams(activity["id"])
+            splits = self.km_wise_splits(streams)
+
+            # If we have stream data, use it
+            if splits:
+                return self.build_run_record(activity, splits)
+
+            # Create fallback data for manual runs without stream data
+            print(f"📝 Creating fallback data for manual run: {activity['name']}")
+            return self.create_fallback_record(activity)
 
-    def fetch_all_runs(self, limit: int = None) -> List[pd.DataFrame]:
-        """Fetch running activities and convert to dataframes"""
+        except Exception as e:
+            print(f"⚠️ Error processing activity {activity['id']}: {e}")
+            # Try to create fallback data even if there's an error
+            try:
+                return self.create_fallback_record(activity)
+            except Exception as fallback_error:
+                print(f"❌ Failed to create fallback data: {fallback_error}")
+                return None
+
+    def fetch_all_runs(
+        self, limit: int = None, after: datetime = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch running activities as plain record dicts.
+
+        Records are already in the final JSON shape, so no DataFrame
+        intermediates are built per run. Listing and stream fetching run
+        as a two-stage pipeline: a dedicated single-worker pool prefetches
+        page N+1 while page N's runs are handed to the stream pool, so
+        page-listing latency disappears behind the stream downloads. The
+        shared session and token buckets keep the concurrency within
+        Strava's quota. Passing after lets incremental syncs list only
+        activities newer than the last one already stored.
+        """
         print("🏃 Fetching running activities from Strava...")
 
-        dfs = []
-        page = 1
+        records = []
+        per_page = 30
+
+        with ThreadPoolExecutor(max_workers=8) as stream_pool, ThreadPoolExecutor(
+            max_workers=1
+        ) as listing_pool:
+            futures = []
+            runs_listed = 0
+            page = 1
+            next_page = listing_pool.submit(
+                self.get_activities, page, per_page, after
+            )
 
-        while True:
-            print(f"📄 Fetching page {page}...")
-            activities = self.get_activities(page=page, per_page=30)
+            # Stop paginating as soon as enough runs are listed or the
+            # last page came back short (end of history) - no trailing
+            # empty-page request and no listing pages whose runs would
+            # be discarded
+            while not limit or runs_listed < limit:
+                print(f"📄 Fetching page {page}...")
+                activities = next_page.result()
 
-            if not activities:
-                break
+                if not activities:
+                    break
 
-            for act in activities:
-                if act["type"] in ["Run", "Trail Run", "Virtual Run"]:
-                    print(f"🏃 {act['name']} ({act['start_date_local']})")
-
-                    try:
-                        streams = self.get_activity_streams(act["id"])
-                        df = self.km_wise_data(streams)
-
-                        # If we have stream data, use it
-                        if not df.empty:
-                            df["Activity_Name"] = act["name"]
-                            df["DateTime"] = pd.to_datetime(act["start_date_local"])
-                            df["total_distance"] = df["KM"].max()
-                            df["run_type"] = (
-                                df["Activity_Name"].str.split(" Run").str[0]
-                            )
-                            dfs.append(df)
-                        else:
-                            # Create fallback data for manual runs without stream data
-                            print(
-                                f"📝 Creating fallback data for manual run: {act['name']}"
-                            )
-                            fallback_df = self.create_fallback_data(act)
-                            if fallback_df is not None:
-                                dfs.append(fallback_df)
-
-                        # Check if we've reached the limit
-                        if limit and len(dfs) >= limit:
-                            print(f"✅ Reached limit of {limit} runs.")
-                            return dfs
-
-                    except Exception as e:
-                        print(f"⚠️ Error processing activity {act['id']}: {e}")
-                        # Try to create fallback data even if there's an error
-                        try:
-                            fallback_df = self.create_fallback_data(act)
-                            if fallback_df is not None:
-                                dfs.append(fallback_df)
-                        except Exception as fallback_error:
-                            print(f"❌ Failed to create fallback data: {fallback_error}")
-
-                    time.sleep(1)  # avoid rate limit
-
-            page += 1
-            time.sleep(2)  # pause between pages
-
-        print(f"✅ Collected {len(dfs)} runs.")
-        return dfs
-
-    def convert_to_json_list(self, dfs: List[pd.DataFrame]) -> List[str]:
-        """Convert dataframes to JSON list format"""
-        json_list = []
-
-        for df in dfs:
-            result = []
-            for activity_name, group in df.groupby("Activity_Name"):
-                DateTime = group["DateTime"].iloc[0].strftime("%Y-%m-%d %H:%M:%S")
-                Distance = group["total_distance"].iloc[0].astype(float)
-                run_type = group["run_type"].iloc[0]
-
-                # Handle missing data gracefully and ensure JSON serializable types
-                avg_hr = group["Avg_HR"].mean()
-                if pd.notna(avg_hr):
-                    avg_hr = float(round(avg_hr, 2))
-                else:
-                    avg_hr = None
-
-                avg_cadence = group["Avg_Cadence"].mean()
-                if pd.notna(avg_cadence):
-                    avg_cadence = float(round(avg_cadence, 2))
-                else:
-                    avg_cadence = None
-
-                avg_power = group["Avg_Power"].mean()
-                if pd.notna(avg_power):
-                    avg_power = float(round(avg_power, 2))
-                else:
-                    avg_power = None
-
-                avg_pace = group["Avg_Pace_min_per_km"].mean()
-                if pd.notna(avg_pace):
-                    avg_pace = float(round(avg_pace, 2))
-                else:
-                    avg_pace = None
-
-                total_elev_gain = group["Elevation_Gain_m"].sum()
-                if pd.notna(total_elev_gain):
-                    total_elev_gain = float(round(total_elev_gain, 1))
-                else:
-                    total_elev_gain = 0.0
-
-                # Create splits with proper handling of missing data
-                splits = []
-                for _, row in group.iterrows():
-                    split_data = {
-                        "KM": int(float(row["KM"])) if pd.notna(row["KM"]) else 1,
-                        "Avg_HR": float(round(row["Avg_HR"], 2))
-                        if pd.notna(row["Avg_HR"])
-                        else None,
-                        "Avg_Cadence": float(round(row["Avg_Cadence"], 2))
-                        if pd.notna(row["Avg_Cadence"])
-                        else None,
-                        "Avg_Power": float(round(row["Avg_Power"], 2))
-                        if pd.notna(row["Avg_Power"])
-                        else None,
-                        "Avg_Pace_min_per_km": float(
-                            round(row["Avg_Pace_min_per_km"], 2)
-                        )
-                        if pd.notna(row["Avg_Pace_min_per_km"])
-                        else None,
-                        "Elevation_Gain_m": float(round(row["Elevation_Gain_m"], 1))
-                        if pd.notna(row["Elevation_Gain_m"])
-                        else 0.0,
-                    }
-                    splits.append(split_data)
-
-                result.append(
-                    {
-                        "Name": activity_name,
-                        "DateTime": DateTime,
-                        "Distance": Distance,
-                        "Run_Type": run_type,
-                        "Avg_HR": avg_hr,
-                        "Avg_Pace": avg_pace,
-                        "Avg_Cadence": avg_cadence,
-                        "Avg_Power": avg_power,
-                        "Elevation_Gain_m": total_elev_gain,
-                        "Splits": splits,
-                    }
-                )
+                # Look-ahead: request the next page before submitting
+                # this one's stream fetches
+                if len(activities) == per_page:
+                    page += 1
+                    next_page = listing_pool.submit(
+                        self.get_activities, page, per_page, after
+                    )
+
+                for act in activities:
+                    if act["type"] in ["Run", "Trail Run", "Virtual Run"]:
+                        print(f"🏃 {act['name']} ({act['start_date_local']})")
+                        futures.append(stream_pool.submit(self._fetch_one, act))
+                        runs_listed += 1
+                        if limit and runs_listed >= limit:
+                            break
+
+                if len(activities) < per_page:
+                    break
 
-            json_output = json.dumps(result, indent=2)
-            json_list.append(json_output)
+            # Harmless no-op unless a prefetched page went unused
+            next_page.cancel()
 
-        return json_list
+            for future in as_completed(futures):
+                record = future.result()
+                if record is not None:
+                    records.append(record)
 
-    def create_fallback_data(self, activity: Dict[str, Any]) -> pd.DataFrame:
-        """Create fallback data structure for manual runs without stream data"""
+                if limit and len(records) >= limit:
+                    print(f"✅ Reached limit of {limit} runs.")
+                    for pending in futures:
+                        pending.cancel()
+                    break
+
+        print(f"✅ Collected {len(records)} runs.")
+        return records[:limit] if limit else records
+
+    def convert_to_json_list(self, records: List[Dict[str, Any]]) -> List[str]:
+        """Serialize run records to the JSON list format"""
+        if orjson is not None:
+            # OPT_SERIALIZE_NUMPY lets any numpy scalar that slips into
+            # a record serialize natively instead of raising TypeError
+            option = orjson.OPT_INDENT_2 | orjson.OPT_SERIALIZE_NUMPY
+            return [orjson.dumps([record], option=option).decode() for record in records]
+        return [json.dumps([record], indent=2) for record in records]
+
+    def create_fallback_record(self, activity: Dict[str, Any]) -> Dict[str, Any]:
+        """Create a fallback record for manual runs without stream data"""
         try:
             # Extract basic activity information
             name = activity.get("name", "Unknown Run")
@@ -374,25 +680,48 @@ class StravaClient:
                 (distance * 1000) / average_speed / 60 if average_speed > 0 else None
             )
 
-            # Create a single row representing the entire run
-            fallback_data = {
-                "KM": [1],  # Single kilometer segment
-                "Avg_HR": [average_heartrate] if average_heartrate else [None],
-                "Avg_Cadence": [None],  # No cadence data for manual runs
-                "Avg_Power": [None],  # No power data for manual runs
-                "Avg_Pace_min_per_km": [avg_pace_min_per_km],
-                "Elevation_Gain_m": [total_elevation_gain],
-                "Activity_Name": [name],
-                "DateTime": [pd.to_datetime(activity.get("start_date_local"))],
-                "total_distance": [distance],
-                "run_type": [name.split(" Run")[0] if " Run" in name else "Unknown"],
+            avg_hr = self._clean(average_heartrate) if average_heartrate else None
+            avg_pace = self._clean(avg_pace_min_per_km)
+            elevation = float(round(total_elevation_gain, 1))
+
+            # Emit one virtual split per (rounded-up) kilometer with the
+            # run-level averages, so manual runs share the same per-km
+            # shape as stream-derived records and downstream plotting
+            # needs no special single-row branch
+            num_km = max(1, int(np.ceil(distance)))
+            elevation_per_km = float(round(elevation / num_km, 1))
+            splits = [
+                {
+                    "KM": km,
+                    "Avg_HR": avg_hr,
+                    "Avg_Cadence": None,
+                    "Avg_Power": None,
+                    "Avg_Pace_min_per_km": avg_pace,
+                    "Elevation_Gain_m": elevation_per_km,
+                }
+                for km in range(1, num_km + 1)
+            ]
+
+            record = {
+                "Name": name,
+                "DateTime": (activity.get("start_date_local") or "")[:19].replace(
+                    "T", " "
+                ),
+                "Distance": float(distance),
+                "Run_Type": self._extract_run_type(name)
+                if " Run" in name
+                else "Unknown",
+                "Avg_HR": avg_hr,
+                "Avg_Pace": avg_pace,
+                "Avg_Cadence": None,  # No cadence data for manual runs
+                "Avg_Power": None,  # No power data for manual runs
+                "Elevation_Gain_m": elevation,
+                "Splits": splits,
             }
-
-            df = pd.DataFrame(fallback_data)
             print(
                 f"✅ Created fallback data for {name}: {distance:.1f}km, {moving_time//60}min"
             )
-            return df
+            return record
 
         except Exception as e:
             print(f"❌ Error creating fallback data: {e}")
@@ -1,5 +1,8 @@
 import asyncio
 import logging
+import re
+import shutil
+import time
 from telegram import Update
 from telegram.ext import (
     Application,
@@ -8,20 +11,24 @@ from telegram.ext import (
     filters,
     ContextTypes,
 )
-from typing import Dict, Any, List
+from telegram.request import HTTPXRequest
+from typing import Dict, Any, List, Tuple
 import os
 import json
+from pathlib import Path
 
-from config import TELEGRAM_TOKEN
-
-print("🔧 Importing workflow_graph...")
-from agents.workflow import workflow_graph
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
 
-print(f"✅ Workflow imported: {type(workflow_graph)}")
+from config import TELEGRAM_TOKEN
 
+from agents.workflow import get_workflow_graph
 from agents.simple_agent import SimpleAgent
 from utils.chat_context import ChatContextManager
 from utils.chroma_manager import ChromaManager
+from utils.user_mapper import UserMapper
 from llm.client import LLMClient
 from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL, CHROMA_DB_DIR
 
@@ -31,23 +38,302 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Per-user data roots, resolved once relative to the repo root instead of
+# re-deriving dirname(dirname(__file__)) inside each handler
+_BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_CHROMA_ROOT = os.path.join(_BASE_DIR, "chroma_stores")
+_PLOTS_ROOT = os.path.join(_BASE_DIR, "plots")
+
+# Keyword patterns for mapping free-form personal-info replies, compiled
+# once. Plain alternation keeps the original substring semantics while
+# doing a single C-level scan per info type instead of a Python keyword loop
+_INFO_KEYWORDS = {
+    "height": ["height", "tall", "cm", "feet", "inch", "'", "ft"],
+    "weight": ["weight", "kg", "lbs", "pound", "lb"],
+    "age": ["age", "years old", "year", "old"],
+    "injuries": ["injury", "injuries", "health", "condition", "pain", "none", "no"],
+    "training_plan": [
+        "training",
+        "plan",
+        "goal",
+        "marathon",
+        "fitness",
+        "5k",
+        "10k",
+        "half",
+    ],
+}
+_INFO_PATTERNS = [
+    (info_type, re.compile("|".join(map(re.escape, keywords)), re.IGNORECASE))
+    for info_type, keywords in _INFO_KEYWORDS.items()
+]
+_DIGIT_RE = re.compile(r"\d")
+
+# Tokenizers for _split_long_message: a paragraph is a run of lines not
+# separated by a blank line, a sentence ends at a period (or the text end)
+_PARA_RE = re.compile(r"[^\n]+(?:\n(?!\n)[^\n]*)*")
+_SENT_RE = re.compile(r"[^.]+(?:\.+|$)")
+
+
+def _chunk_spans(pattern, text: str, lo: int, hi: int, max_length: int):
+    """Group pattern matches in text[lo:hi] into spans of <= max_length.
+
+    Yields (start, end) offsets into the original string so callers can
+    slice it directly instead of building intermediate token lists. A
+    single match longer than max_length is yielded on its own for the
+    caller to split further.
+    """
+    run_start = None
+    prev_end = None
+    for match in pattern.finditer(text, lo, hi):
+        start, end = match.span()
+        if run_start is None:
+            run_start, prev_end = start, end
+            continue
+        if end - run_start > max_length:
+            yield run_start, prev_end
+            run_start = start
+        prev_end = end
+    if run_start is not None:
+        yield run_start, prev_end
+
+# With pyahocorasick installed, all keywords are folded into one automaton
+# so each line is scanned exactly once regardless of how many info types
+# exist; otherwise we fall back to the per-type alternation patterns above
+if ahocorasick is not None:
+    _INFO_AUTOMATON = ahocorasick.Automaton()
+    for _info_type, _keywords in _INFO_KEYWORDS.items():
+        for _keyword in _keywords:
+            _INFO_AUTOMATON.add_word(_keyword, _info_type)
+    _INFO_AUTOMATON.make_automaton()
+else:
+    _INFO_AUTOMATON = None
+
+
+def _match_info_type(line_lower: str) -> str | None:
+    """Map a lowercased answer line to an info type, or None if no keyword hits"""
+    if _INFO_AUTOMATON is not None:
+        for _, info_type in _INFO_AUTOMATON.iter(line_lower):
+            return info_type
+        return None
+    for info_type, pattern in _INFO_PATTERNS:
+        if pattern.search(line_lower):
+            return info_type
+    return None
+
+# Blank workflow state shared by sync_command and handle_message; per-call
+# states are built with a dict spread so the literal isn't rebuilt key by
+# key on every message. Empty collections are tuples rather than lists so
+# the shared template can't be mutated across calls - the workflow nodes
+# always replace these fields wholesale, never append to them.
+_INITIAL_STATE_TEMPLATE = {
+    "strava_data": (),
+    "json_list": (),
+    "documents": (),
+    "query": {},
+    "retrieved_docs": (),
+    "context": "",
+    "coach_response": "",
+    "plot_path": "",
+    "final_response": "",
+    "error": "",
+    "needs_personal_info": False,
+    "personal_info_questions": (),
+    "skip_to_end": False,
+}
+
 
 class StravaBot:
+    # Static message bodies built once at class definition; handlers fill
+    # in the dynamic bits with one .format() call instead of a chain of
+    # += concatenations per invocation
+    HELP_TEXT = """
+🤖 **Strava Running Coach Bot - Help**
+
+**Commands:**
+/start - Start the bot and get personal info questions
+/help - Show this help message
+/sync - Sync your latest Strava data
+/clear - Clear your chat history
+/info - Set your personal information
+/reset - Reset your chat context and personal info
+/reset_all - Complete reset (including all Strava data)
+
+**Example Questions:**
+• "Compare my last two long runs"
+• "How did my easy runs perform in August?"
+• "Show me my fastest 10K"
+• "Analyze my heart rate trends"
+• "What's my average pace for tempo runs?"
+
+**Features:**
+• 📊 Automatic data visualization
+• 🏃‍♂️ Personalized coaching insights
+• 📈 Performance trend analysis
+• 💬 Chat context memory
+• 🔄 Automatic Strava sync
+
+The bot will analyze your running data and provide insights with visualizations!
+        """
+
+    _WELCOME_NEW_USER_TPL = (
+        "👋 Welcome {username}! I'm your personal Strava running coach.\n\n"
+        "Before we start, I need some information to provide better coaching:\n\n"
+        "{questions}\n"
+        "\nPlease provide this information one by one, or use /info to set it all at once."
+    )
+
+    _WELCOME_RETURNING_WITH_DATA_TPL = (
+        "👋 Welcome back {username}! I'm your personal Strava running coach.\n\n"
+        "📊 You have {n} runs in your database.\n\n"
+        "Ask me anything about your running data! For example:\n"
+        "• 'Compare my last two long runs'\n"
+        "• 'How did my easy runs perform in August?'\n"
+        "• 'Show me my fastest 10K'\n\n"
+        "Use /sync to update your Strava data, /help for more commands."
+    )
+
+    _WELCOME_RETURNING_NO_DATA_TPL = (
+        "👋 Welcome back {username}! I'm your personal Strava running coach.\n\n"
+        "📊 No running data found. Let's sync your Strava data first!\n\n"
+        "Use /sync to import your runs from Strava."
+    )
+
+    _WELCOME_RETURNING_FALLBACK_TPL = (
+        "👋 Welcome back {username}! I'm your personal Strava running coach.\n\n"
+        "📊 Let's sync your Strava data first!\n\n"
+        "Use /sync to import your runs from Strava."
+    )
+
     def __init__(self):
         self.token = TELEGRAM_TOKEN
         self.chat_manager = ChatContextManager()
         self.llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
         self.simple_agent = SimpleAgent()
 
-        # Initialize the agentic workflow
-        print("🔧 Assigning workflow to bot...")
-        self.workflow = workflow_graph
-        print(f"✅ Workflow assigned to bot: {type(self.workflow)}")
-
-        # Initialize bot
-        self.application = Application.builder().token(self.token).build()
+        # Per-user ChromaManager cache - opening the persistent Chroma
+        # client on every message is expensive setup for a single lookup
+        self._chroma_cache: Dict[str, ChromaManager] = {}
+
+        # Cached "user has data" booleans so every message doesn't scan
+        # the vector store just to test emptiness; entries expire after
+        # 60s and are refreshed by /sync and /reset_all
+        self._has_data: Dict[str, tuple] = {}
+        self._has_data_ttl = 60.0
+
+        # Initialize the agentic workflow (compiled lazily on first use)
+        self.workflow = get_workflow_graph()
+
+        # Workflow invocations are funneled through a queue so requests
+        # that land within the same short window are dispatched as one
+        # abatch() call - the LLM/embedding calls inside the graph then
+        # share provider round-trips. The consumer task is started lazily
+        # from the first submit, once run_polling's event loop exists
+        self._workflow_queue: asyncio.Queue = asyncio.Queue()
+        self._workflow_consumer: asyncio.Task | None = None
+        self._batch_window = 0.05
+        self._batch_max = 8
+
+        # Initialize bot - dispatch handlers concurrently so one user's
+        # slow workflow run doesn't stall other chats. A larger keep-alive
+        # connection pool lets bursts of sends (progress edits, split
+        # messages, photo uploads) reuse TLS connections instead of
+        # handshaking per call.
+        self.application = (
+            Application.builder()
+            .token(self.token)
+            .concurrent_updates(True)
+            .request(HTTPXRequest(connection_pool_size=64, pool_timeout=10.0))
+            .get_updates_request(HTTPXRequest(connection_pool_size=32))
+            .build()
+        )
         self._setup_handlers()
 
+    def _get_chroma_manager(self, user_id: str) -> ChromaManager:
+        """Get the cached ChromaManager for a user, creating it once"""
+        manager = self._chroma_cache.get(user_id)
+        if manager is None:
+            chroma_dir = os.path.join(_CHROMA_ROOT, user_id)
+            manager = ChromaManager(chroma_dir, self.llm_client.embeddings)
+            self._chroma_cache[user_id] = manager
+        return manager
+
+    async def _submit_workflow(self, state: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a workflow invocation and await its result.
+
+        Invocations queued within the same batching window are run as a
+        single workflow.abatch() call.
+        """
+        if self._workflow_consumer is None or self._workflow_consumer.done():
+            self._workflow_consumer = asyncio.create_task(
+                self._drain_workflow_queue()
+            )
+
+        future = asyncio.get_running_loop().create_future()
+        self._workflow_queue.put_nowait((state, future))
+        return await future
+
+    async def _drain_workflow_queue(self):
+        """Consume queued workflow invocations, batching nearby arrivals"""
+        while True:
+            batch = [await self._workflow_queue.get()]
+
+            # Collect whatever else lands within the window, up to the cap
+            try:
+                while len(batch) < self._batch_max:
+                    batch.append(
+                        await asyncio.wait_for(
+                            self._workflow_queue.get(), timeout=self._batch_window
+                        )
+                    )
+            except asyncio.TimeoutError:
+                pass
+
+            if len(batch) == 1:
+                state, future = batch[0]
+                try:
+                    result = await self.workflow.ainvoke(state)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                else:
+                    if not future.done():
+                        future.set_result(result)
+                continue
+
+            states = [item[0] for item in batch]
+            try:
+                results = await self.workflow.abatch(
+                    states, return_exceptions=True
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future), result in zip(batch, results):
+                    if future.done():
+                        continue
+                    if isinstance(result, Exception):
+                        future.set_exception(result)
+                    else:
+                        future.set_result(result)
+
+    def _user_has_data(self, user_id: str) -> bool:
+        """Cached check that the user has any runs stored"""
+        cached = self._has_data.get(user_id)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+
+        try:
+            has_data = self._get_chroma_manager(user_id).count() > 0
+        except Exception:
+            # If ChromaDB check fails, assume no data
+            has_data = False
+
+        self._has_data[user_id] = (time.monotonic() + self._has_data_ttl, has_data)
+        return has_data
+
     def _setup_handlers(self):
         """Setup bot command and message handlers"""
         # Commands
@@ -75,87 +361,36 @@ class StravaBot:
         questions = self.chat_manager.ask_for_personal_info(user_id)
 
         if questions:
-            welcome_msg = (
-                f"👋 Welcome {username}! I'm your personal Strava running coach.\n\n"
+            welcome_msg = self._WELCOME_NEW_USER_TPL.format(
+                username=username,
+                questions="\n".join(
+                    f"{i}. {question}" for i, question in enumerate(questions, 1)
+                ),
             )
-            welcome_msg += "Before we start, I need some information to provide better coaching:\n\n"
-
-            for i, question in enumerate(questions, 1):
-                welcome_msg += f"{i}. {question}\n"
-
-            welcome_msg += "\nPlease provide this information one by one, or use /info to set it all at once."
         else:
             # Check if user has data in ChromaDB
-            from utils.chroma_manager import ChromaManager
-            from llm.client import LLMClient
-            from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
-
             try:
-                llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-                # Ensure chroma stores are in the new_bot directory
-                import os
-
-                chroma_dir = os.path.join("./chroma_stores", str(user_id))
-                chroma_manager = ChromaManager(chroma_dir, llm_client.embeddings)
-                existing_runs = chroma_manager.get_existing_run_names()
-
-                if existing_runs:
-                    welcome_msg = f"👋 Welcome back {username}! I'm your personal Strava running coach.\n\n"
-                    welcome_msg += (
-                        f"📊 You have {len(existing_runs)} runs in your database.\n\n"
-                    )
-                    welcome_msg += (
-                        "Ask me anything about your running data! For example:\n"
-                    )
-                    welcome_msg += "• 'Compare my last two long runs'\n"
-                    welcome_msg += "• 'How did my easy runs perform in August?'\n"
-                    welcome_msg += "• 'Show me my fastest 10K'\n\n"
-                    welcome_msg += (
-                        "Use /sync to update your Strava data, /help for more commands."
+                chroma_manager = self._get_chroma_manager(user_id)
+                run_count = chroma_manager.count()
+
+                if run_count:
+                    welcome_msg = self._WELCOME_RETURNING_WITH_DATA_TPL.format(
+                        username=username, n=run_count
                     )
                 else:
-                    welcome_msg = f"👋 Welcome back {username}! I'm your personal Strava running coach.\n\n"
-                    welcome_msg += "📊 No running data found. Let's sync your Strava data first!\n\n"
-                    welcome_msg += "Use /sync to import your runs from Strava."
-            except Exception as e:
-                welcome_msg = f"👋 Welcome back {username}! I'm your personal Strava running coach.\n\n"
-                welcome_msg += "📊 Let's sync your Strava data first!\n\n"
-                welcome_msg += "Use /sync to import your runs from Strava."
+                    welcome_msg = self._WELCOME_RETURNING_NO_DATA_TPL.format(
+                        username=username
+                    )
+            except Exception:
+                welcome_msg = self._WELCOME_RETURNING_FALLBACK_TPL.format(
+                    username=username
+                )
 
         await update.message.reply_text(welcome_msg)
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /help command"""
-        help_text = """
-🤖 **Strava Running Coach Bot - Help**
-
-**Commands:**
-/start - Start the bot and get personal info questions
-/help - Show this help message
-/sync - Sync your latest Strava data
-/clear - Clear your chat history
-/info - Set your personal information
-/reset - Reset your chat context and personal info
-/reset_all - Complete reset (including all Strava data)
-
-**Example Questions:**
-• "Compare my last two long runs"
-• "How did my easy runs perform in August?"
-• "Show me my fastest 10K"
-• "Analyze my heart rate trends"
-• "What's my average pace for tempo runs?"
-
-**Features:**
-• 📊 Automatic data visualization
-• 🏃‍♂️ Personalized coaching insights
-• 📈 Performance trend analysis
-• 💬 Chat context memory
-• 🔄 Automatic Strava sync
-
-The bot will analyze your running data and provide insights with visualizations!
-        """
-
-        await update.message.reply_text(help_text, parse_mode="Markdown")
+        await update.message.reply_text(self.HELP_TEXT, parse_mode="Markdown")
 
     async def sync_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle /sync command to sync Strava data"""
@@ -166,57 +401,53 @@ The bot will analyze your running data and provide insights with visualizations!
             "🔄 Starting Strava data sync..."
         )
 
-        try:
-            # Progress updates
-            await status_message.edit_text("🔄 Step 1/4: Fetching runs from Strava...")
+        # Edit via the bot with a pre-resolved chat/message id rather than
+        # Message.edit_text, which re-resolves the chat on every call
+        chat_id = update.effective_chat.id
+        message_id = status_message.message_id
 
+        def edit_status(text: str, **kwargs):
+            return context.bot.edit_message_text(
+                text, chat_id=chat_id, message_id=message_id, **kwargs
+            )
+
+        try:
             # Run the workflow to sync data
             initial_state = {
+                **_INITIAL_STATE_TEMPLATE,
                 "user_id": user_id,
                 "user_message": "sync_data",
-                "strava_data": [],
-                "json_list": [],
-                "documents": [],
-                "query": {},
-                "retrieved_docs": [],
-                "context": "",
-                "coach_response": "",
-                "plot_path": "",
-                "final_response": "",
-                "error": "",
-                "needs_personal_info": False,
-                "personal_info_questions": [],
-                "skip_to_end": False,
             }
 
-            # Run the workflow
-            await status_message.edit_text("🔄 Step 2/4: Processing run data...")
-            result = self.workflow.invoke(initial_state)
+            # Run the workflow as a task and cycle progress edits while it
+            # works - one throttled edit every couple of seconds instead of
+            # a burst of round-trips the user never sees
+            task = asyncio.ensure_future(self._submit_workflow(initial_state))
+            stages = [
+                "🔄 Fetching runs from Strava...",
+                "🔄 Processing run data...",
+                "🔄 Storing runs in vector database...",
+                "🔄 Finalizing...",
+            ]
+            stage = 0
+            while not task.done():
+                try:
+                    await asyncio.wait_for(asyncio.shield(task), timeout=2.0)
+                except asyncio.TimeoutError:
+                    try:
+                        await edit_status(stages[stage])
+                    except Exception:
+                        # Progress edits are best-effort (rate limits etc.)
+                        pass
+                    stage = min(stage + 1, len(stages) - 1)
+            result = await task
 
             if result.get("error"):
-                await status_message.edit_text(
-                    f"❌ Error syncing data: {result['error']}"
-                )
+                await edit_status(f"❌ Error syncing data: {result['error']}")
                 return
 
-            # Check what was actually synced
-            if result.get("strava_data"):
-                runs_count = len(result["strava_data"])
-                await status_message.edit_text(
-                    f"🔄 Step 3/4: Synced {runs_count} runs from Strava..."
-                )
-            else:
-                await status_message.edit_text(
-                    "🔄 Step 3/4: Processing existing data..."
-                )
-
-            if result.get("documents"):
-                docs_count = len(result["documents"])
-                await status_message.edit_text(
-                    f"🔄 Step 4/4: Storing {docs_count} runs in vector database..."
-                )
-            else:
-                await status_message.edit_text("🔄 Step 4/4: Finalizing...")
+            # Sync succeeded, so the user definitely has data now
+            self._has_data[user_id] = (time.monotonic() + self._has_data_ttl, True)
 
             # Success message with details
             if result.get("strava_data") and result.get("documents"):
@@ -231,7 +462,7 @@ The bot will analyze your running data and provide insights with visualizations!
                 success_msg += "• 'Show me my fastest 10K'\n"
                 success_msg += "• 'Analyze my heart rate trends'"
 
-                await status_message.edit_text(success_msg, parse_mode="Markdown")
+                await edit_status(success_msg, parse_mode="Markdown")
             elif not result.get("strava_data") and not result.get("documents"):
                 success_msg = f"✅ **Sync Complete!**\n\n"
                 success_msg += (
@@ -243,16 +474,16 @@ The bot will analyze your running data and provide insights with visualizations!
                 success_msg += "• 'Show me my fastest 10K'\n"
                 success_msg += "• 'Analyze my heart rate trends'"
 
-                await status_message.edit_text(success_msg, parse_mode="Markdown")
+                await edit_status(success_msg, parse_mode="Markdown")
             else:
-                await status_message.edit_text(
+                await edit_status(
                     "✅ Strava data sync completed! You can now ask questions about your runs."
                 )
 
         except Exception as e:
             logger.error(f"Error in sync command: {e}")
             # Don't show technical errors to users
-            await status_message.edit_text(
+            await edit_status(
                 "❌ **Sync Failed**\n\nSomething went wrong during the sync. Please try again in a few minutes."
             )
 
@@ -318,28 +549,19 @@ The bot will analyze your running data and provide insights with visualizations!
             current_context["preferences"] = {}
             self.chat_manager.update_user_context(user_id, current_context)
 
-            # Clear ChromaDB data
-            import shutil
-            import os
-
-            chroma_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)),
-                "chroma_stores",
-                str(user_id),
-            )
-            if os.path.exists(chroma_path):
-                shutil.rmtree(chroma_path)
-                print(f"🗑️ Deleted ChromaDB for user {user_id}")
+            # Clear ChromaDB data (and drop the cached manager handle)
+            self._chroma_cache.pop(user_id, None)
+            self._has_data.pop(user_id, None)
+            chroma_path = os.path.join(_CHROMA_ROOT, user_id)
+            # Recursive deletes on a large store can take seconds - run
+            # them off the event loop; ignore_errors covers missing dirs
+            await asyncio.to_thread(shutil.rmtree, chroma_path, ignore_errors=True)
+            logger.debug("🗑️ Deleted ChromaDB for user %s", user_id)
 
             # Clear plots
-            import os
-
-            plots_path = os.path.join(
-                os.path.dirname(os.path.dirname(__file__)), "plots", str(user_id)
-            )
-            if os.path.exists(plots_path):
-                shutil.rmtree(plots_path)
-                print(f"🗑️ Deleted plots for user {user_id}")
+            plots_path = os.path.join(_PLOTS_ROOT, user_id)
+            await asyncio.to_thread(shutil.rmtree, plots_path, ignore_errors=True)
+            logger.debug("🗑️ Deleted plots for user %s", user_id)
 
             await update.message.reply_text(
                 "💥 Complete reset! All data including Strava runs have been cleared. Use /start to begin fresh."
@@ -356,30 +578,41 @@ The bot will analyze your running data and provide insights with visualizations!
         user_id = str(update.effective_user.id)
         user_message = update.message.text
 
-        print(f"\n🚀 ===== NEW MESSAGE RECEIVED =====")
-        print(f"🔍 Telegram Update Debug:")
-        print(f"   effective_user.id: {update.effective_user.id}")
-        print(f"   effective_user.username: {update.effective_user.username}")
-        print(f"   effective_user.first_name: {update.effective_user.first_name}")
-        print(f"   effective_user.last_name: {update.effective_user.last_name}")
-        print(f"   message.chat.id: {update.message.chat.id}")
-        print(f"   message.from_user.id: {update.message.from_user.id}")
-        print(f"   message.from_user.username: {update.message.from_user.username}")
-        print(f"   message.from_user.first_name: {update.message.from_user.first_name}")
-        print(f"   message.from_user.last_name: {update.message.from_user.last_name}")
-        print(f"   Extracted user_id: {user_id}")
-        print(f"   Message: {user_message}")
-
-        # Check if this user is configured in the system
-        from utils.user_mapper import UserMapper
-
-        # Debug logging
-        print(f"🔍 Bot received message from user_id: {user_id}")
-        print(f"🔍 User ID type: {type(user_id)}")
-        print(f"🔍 Is user configured: {UserMapper.is_user_configured(user_id)}")
+        # The full update dump is only worth formatting when DEBUG is on
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("🚀 ===== NEW MESSAGE RECEIVED =====")
+            logger.debug("🔍 Telegram Update Debug:")
+            logger.debug("   effective_user.id: %s", update.effective_user.id)
+            logger.debug(
+                "   effective_user.username: %s", update.effective_user.username
+            )
+            logger.debug(
+                "   effective_user.first_name: %s", update.effective_user.first_name
+            )
+            logger.debug(
+                "   effective_user.last_name: %s", update.effective_user.last_name
+            )
+            logger.debug("   message.chat.id: %s", update.message.chat.id)
+            logger.debug("   message.from_user.id: %s", update.message.from_user.id)
+            logger.debug(
+                "   message.from_user.username: %s", update.message.from_user.username
+            )
+            logger.debug(
+                "   message.from_user.first_name: %s",
+                update.message.from_user.first_name,
+            )
+            logger.debug(
+                "   message.from_user.last_name: %s",
+                update.message.from_user.last_name,
+            )
+            logger.debug("   Extracted user_id: %s", user_id)
+            logger.debug("   Message: %s", user_message)
+            logger.debug(
+                "🔍 Is user configured: %s", UserMapper.is_user_configured(user_id)
+            )
 
         if not UserMapper.is_user_configured(user_id):
-            print(f"❌ User {user_id} not configured - sending error message")
+            logger.debug("❌ User %s not configured - sending error message", user_id)
             await update.message.reply_text(
                 "❌ **User Not Configured**\n\n"
                 "This Telegram account is not configured to use the Strava bot.\n"
@@ -387,22 +620,28 @@ The bot will analyze your running data and provide insights with visualizations!
             )
             return
 
-        print(f"✅ User {user_id} is configured - proceeding with message handling")
+        logger.debug(
+            "✅ User %s is configured - proceeding with message handling", user_id
+        )
 
-        # Check if this is a personal info response
-        print(f"🔍 Checking if message is personal info response...")
-        if await self._handle_personal_info(user_id, user_message, update):
-            print(f"✅ Message handled as personal info response")
+        # Check if this is a personal info response; fetch the outstanding
+        # questions once and reuse them for the workflow gate below instead
+        # of hitting the context store twice per message
+        questions = self.chat_manager.ask_for_personal_info(user_id)
+        handled, questions = await self._handle_personal_info(
+            user_id, user_message, update, questions
+        )
+        if handled:
+            logger.debug("✅ Message handled as personal info response")
             return
 
-        print(f"🔍 Message is not personal info - proceeding to agentic workflow")
+        logger.debug("🔍 Message is not personal info - proceeding to agentic workflow")
 
         # Check if user needs to provide personal info first
-        questions = self.chat_manager.ask_for_personal_info(user_id)
         if questions:
             # TEMPORARY: Skip personal info check for wife's user ID
             if user_id == "1088864531":
-                print(f"🔧 Skipping personal info check for wife's user ID")
+                logger.debug("🔧 Skipping personal info check for wife's user ID")
             else:
                 await update.message.reply_text(
                     "⚠️ Please provide your personal information first using /info command."
@@ -420,27 +659,8 @@ The bot will analyze your running data and provide insights with visualizations!
             )
             return
 
-        # Check if user has any data in ChromaDB
-        from utils.chroma_manager import ChromaManager
-        from llm.client import LLMClient
-        from config import GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL
-
-        try:
-            llm_client = LLMClient(GOOGLE_API_KEY, MODEL_NAME, EMBED_MODEL)
-            # Ensure chroma stores are in the new_bot directory
-            import os
-
-            chroma_dir = os.path.join("./chroma_stores", str(user_id))
-            chroma_manager = ChromaManager(chroma_dir, llm_client.embeddings)
-            existing_runs = chroma_manager.get_existing_run_names()
-
-            if not existing_runs:
-                await update.message.reply_text(
-                    "📊 No Strava data found. Use /sync to import your runs first."
-                )
-                return
-        except Exception as e:
-            # If ChromaDB check fails, assume no data
+        # Check if user has any data in ChromaDB (cached with a short TTL)
+        if not self._user_has_data(user_id):
             await update.message.reply_text(
                 "📊 No Strava data found. Use /sync to import your runs first."
             )
@@ -451,41 +671,24 @@ The bot will analyze your running data and provide insights with visualizations!
             "🤔 Processing your question... This may take a moment."
         )
 
-        print(f"🚀 Starting agentic workflow for user {user_id}")
-        print(f"🔍 User message: {user_message}")
+        logger.debug("🚀 Starting agentic workflow for user %s", user_id)
+        logger.debug("🔍 User message: %s", user_message)
 
         try:
             # Run the workflow
-            print(f"🔍 Creating workflow state...")
             initial_state = {
+                **_INITIAL_STATE_TEMPLATE,
                 "user_id": user_id,
                 "user_message": user_message,
-                "strava_data": [],
-                "json_list": [],
-                "documents": [],
-                "query": {},
-                "retrieved_docs": [],
-                "context": "",
-                "coach_response": "",
-                "plot_path": "",
-                "final_response": "",
-                "error": "",
-                "needs_personal_info": False,
-                "personal_info_questions": [],
-                "skip_to_end": False,
             }
 
-            # Run the workflow
-            print(f"🔍 Invoking self.workflow.invoke()...")
-            print(f"🔍 Workflow state: {initial_state}")
-            print(f"🔍 Workflow object type: {type(self.workflow)}")
-
-            result = self.workflow.invoke(initial_state)
-            print(f"✅ Workflow completed successfully!")
-            print(f"🔍 Workflow result: {result}")
+            logger.debug("🔍 Invoking self.workflow.ainvoke()...")
+            result = await self._submit_workflow(initial_state)
+            logger.debug("✅ Workflow completed successfully!")
+            logger.debug("🔍 Workflow result: %s", result)
 
             if result.get("error"):
-                print(f"❌ Workflow returned error: {result['error']}")
+                logger.debug("❌ Workflow returned error: %s", result["error"])
                 await update.message.reply_text(f"❌ Error: {result['error']}")
             else:
                 # Send the response as plain text (no markdown formatting)
@@ -504,12 +707,15 @@ The bot will analyze your running data and provide insights with visualizations!
                         "❌ Sorry, I encountered an error sending the response. Please try again."
                     )
 
-                # Send plot if available
-                if result.get("plot_path") and os.path.exists(result["plot_path"]):
-                    with open(result["plot_path"], "rb") as photo:
-                        await update.message.reply_photo(
-                            photo=photo, caption="📊 Your run analysis visualization"
-                        )
+                # Send plot if available; hand the path to the library
+                # (a str would be taken as a file_id/URL, a Path is read
+                # as a local file) instead of blocking on open() ourselves
+                plot_path = result.get("plot_path")
+                if plot_path and await asyncio.to_thread(os.path.exists, plot_path):
+                    await update.message.reply_photo(
+                        photo=Path(plot_path),
+                        caption="📊 Your run analysis visualization",
+                    )
 
                 # Update chat context
                 self.chat_manager.add_chat_message(
@@ -524,94 +730,74 @@ The bot will analyze your running data and provide insights with visualizations!
             )
 
     async def _handle_personal_info(
-        self, user_id: str, message: str, update: Update
-    ) -> bool:
-        """Handle personal information responses"""
+        self, user_id: str, message: str, update: Update, questions: List[str]
+    ) -> Tuple[bool, List[str]]:
+        """Handle personal information responses.
+
+        Takes the pre-fetched outstanding questions and returns
+        (handled, still_needed) so the caller doesn't have to re-read the
+        context store after this runs.
+        """
         # TEMPORARY: Skip personal info handling for wife's user ID
         if user_id == "1088864531":
-            print(f"🔧 Skipping personal info handling for wife's user ID")
-            return False
-
-        questions = self.chat_manager.ask_for_personal_info(user_id)
+            logger.debug("🔧 Skipping personal info handling for wife's user ID")
+            return False, questions
 
         if not questions:
-            return False
+            return False, questions
 
         # Check if message contains multiple answers (separated by newlines)
         lines = [line.strip() for line in message.split("\n") if line.strip()]
 
         if len(lines) == 1 and len(questions) == 1:
             # Single answer for single question
-            self.chat_manager.update_personal_info(user_id, "general", lines[0])
+            with self.chat_manager.transaction(user_id) as ctx:
+                personal = ctx.setdefault("personal_info", {})
+                personal["general"] = lines[0]
+                remaining_questions = self.chat_manager.missing_questions(personal)
             await update.message.reply_text(
                 "✅ Thank you! Your information has been saved."
             )
-            return True
+            return True, remaining_questions
 
         elif len(lines) >= len(questions):
-            # Multiple answers - try to map them
-            info_mapping = {
-                "height": ["height", "tall", "cm", "feet", "inch", "'", "ft"],
-                "weight": ["weight", "kg", "lbs", "pound", "lb"],
-                "age": ["age", "years old", "year", "old"],
-                "injuries": [
-                    "injury",
-                    "injuries",
-                    "health",
-                    "condition",
-                    "pain",
-                    "none",
-                    "no",
-                ],
-                "training_plan": [
-                    "training",
-                    "plan",
-                    "goal",
-                    "marathon",
-                    "fitness",
-                    "5k",
-                    "10k",
-                    "half",
-                ],
-            }
-
-            # Track what was successfully mapped
-            mapped_info = set()
-
-            for line in lines:
-                line_lower = line.lower()
-                mapped = False
-
-                for info_type, keywords in info_mapping.items():
-                    if any(keyword in line_lower for keyword in keywords):
-                        self.chat_manager.update_personal_info(user_id, info_type, line)
-                        mapped_info.add(info_type)
-                        mapped = True
-                        break
-
-                if not mapped:
-                    # Try to guess based on content
-                    if any(char.isdigit() for char in line):
-                        if "'" in line or "ft" in line or "cm" in line:
-                            self.chat_manager.update_personal_info(
-                                user_id, "height", line
-                            )
-                            mapped_info.add("height")
-                        elif "kg" in line or "lbs" in line or "lb" in line:
-                            self.chat_manager.update_personal_info(
-                                user_id, "weight", line
-                            )
-                            mapped_info.add("weight")
-                        elif "year" in line or int(line) < 100:
-                            self.chat_manager.update_personal_info(user_id, "age", line)
-                            mapped_info.add("age")
+            # Multiple answers - map them with the precompiled patterns
+            # inside one transaction: a single context read/write instead
+            # of one per matched line
+            with self.chat_manager.transaction(user_id) as ctx:
+                personal = ctx.setdefault("personal_info", {})
+
+                for line in lines:
+                    line_lower = line.lower()
+                    info_type = _match_info_type(line_lower)
+                    if info_type is not None:
+                        personal[info_type] = line
+                    else:
+                        # Try to guess based on content
+                        if _DIGIT_RE.search(line):
+                            if "'" in line or "ft" in line_lower or "cm" in line_lower:
+                                personal["height"] = line
+                            elif (
+                                "kg" in line_lower
+                                or "lbs" in line_lower
+                                or "lb" in line_lower
+                            ):
+                                personal["weight"] = line
+                            # isdigit guards the int() call - a line like
+                            # 5'10 contains digits but isn't wholly numeric
+                            # and used to raise ValueError here
+                            elif "year" in line_lower or (
+                                line.isdigit() and int(line) < 100
+                            ):
+                                personal["age"] = line
+
+                # Check if all info is now collected
+                remaining_questions = self.chat_manager.missing_questions(personal)
 
             await update.message.reply_text(
                 "✅ Thank you! Your information has been saved."
             )
 
-            # Check if all info is now collected
-            remaining_questions = self.chat_manager.ask_for_personal_info(user_id)
             if not remaining_questions:
                 await update.message.reply_text(
                     "🎉 All personal information collected! Now let's sync your Strava data. Use /sync to get started."
@@ -621,60 +807,38 @@ The bot will analyze your running data and provide insights with visualizations!
                     f"📝 Still need: {', '.join(remaining_questions)}"
                 )
 
-            return True
+            return True, remaining_questions
 
-        return False
+        return False, questions
 
     def _split_long_message(self, message: str, max_length: int = 4000) -> List[str]:
         """Split a long message into multiple parts"""
         if len(message) <= max_length:
             return [message]
 
-        parts = []
-        current_part = ""
-
-        # Split by paragraphs first
-        paragraphs = message.split("\n\n")
-
-        for paragraph in paragraphs:
-            # If adding this paragraph would exceed limit, start new part
-            if len(current_part) + len(paragraph) + 2 > max_length and current_part:
-                parts.append(current_part.strip())
-                current_part = paragraph
-            else:
-                if current_part:
-                    current_part += "\n\n" + paragraph
-                else:
-                    current_part = paragraph
-
-        # Add the last part
-        if current_part:
-            parts.append(current_part.strip())
-
-        # If any part is still too long, split by sentences
+        # Walk paragraph spans over the original string and slice it in
+        # place - no intermediate paragraph/sentence lists, one string
+        # allocation per emitted part
         final_parts = []
-        for part in parts:
-            if len(part) <= max_length:
-                final_parts.append(part)
-            else:
-                # Split by sentences
-                sentences = part.split(". ")
-                current_sentence_part = ""
-                for sentence in sentences:
-                    if (
-                        len(current_sentence_part) + len(sentence) + 2 > max_length
-                        and current_sentence_part
-                    ):
-                        final_parts.append(current_sentence_part.strip() + ".")
-                        current_sentence_part = sentence
-                    else:
-                        if current_sentence_part:
-                            current_sentence_part += ". " + sentence
-                        else:
-                            current_sentence_part = sentence
+        for p_start, p_end in _chunk_spans(_PARA_RE, message, 0, len(message), max_length):
+            if p_end - p_start <= max_length:
+                final_parts.append(message[p_start:p_end].strip())
+                continue
+
+            # A single paragraph exceeds the limit - fall back to sentences
+            for s_start, s_end in _chunk_spans(
+                _SENT_RE, message, p_start, p_end, max_length
+            ):
+                if s_end - s_start <= max_length:
+                    final_parts.append(message[s_start:s_end].strip())
+                else:
+                    # No sentence boundaries to split on - hard-slice
+                    final_parts.extend(
+                        message[i : min(i + max_length, s_end)].strip()
+                        for i in range(s_start, s_end, max_length)
+                    )
 
-                if current_sentence_part:
-                    final_parts.append(current_sentence_part.strip())
+        final_parts = [part for part in final_parts if part]
 
         return final_parts
 
@@ -1,13 +1,103 @@
+import atexit
 import json
 import os
-from typing import Dict, List, Optional
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Set
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+# On-disk format suffixes. With msgpack installed, contexts are stored
+# binary: ~2-3x smaller than indented JSON (chat_history rewrites the
+# same long response strings every turn) and parsed at C speed, which
+# also shrinks every fsync in _write_context. The public context dict
+# stays JSON-shaped either way.
+_JSON_SUFFIX = "_context.json"
+_MPK_SUFFIX = "_context.mpk"
+_CONTEXT_SUFFIX = _MPK_SUFFIX if msgpack is not None else _JSON_SUFFIX
+
+
+def _load_context(file_path: str) -> Dict:
+    """Parse a context file: msgpack for .mpk, orjson/json for .json"""
+    with open(file_path, "rb") as f:
+        raw = f.read()
+    if file_path.endswith(_MPK_SUFFIX):
+        return msgpack.unpackb(raw, raw=False)
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def _write_context(file_path: str, context: Dict):
+    """Serialize a context to disk in one buffer, atomically.
+
+    The serializer follows the target extension; both encode to a single
+    bytes buffer. The payload lands in a temp file that is fsynced and
+    renamed over the target, so a crash mid-write can't leave a
+    truncated file that get_user_context would silently swallow as a
+    fresh default context, discarding the chat history.
+    """
+    if file_path.endswith(_MPK_SUFFIX):
+        payload = msgpack.packb(context, use_bin_type=True)
+    elif orjson is not None:
+        payload = orjson.dumps(context, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(context, indent=2).encode()
+
+    target_dir = os.path.dirname(file_path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=target_dir, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+# Per-user context cache with a dirty write-back policy. A user's context
+# barely changes between consecutive messages, so callers like
+# get_chat_summary and ask_for_personal_info don't need to re-read the
+# file every request; mutations update the cached dict in place and are
+# flushed to disk every few writes (and at interpreter exit) instead of
+# on every single update. Module-level because ChatContextManager is
+# constructed per agent call; the lock lets concurrent handler threads
+# share it safely.
+_context_cache: Dict[str, tuple] = {}
+_CONTEXT_TTL = 30.0  # seconds; clean entries only - dirty ones never expire
+_dirty: Set[str] = set()
+_dirty_counts: Dict[str, int] = {}
+_cache_lock = threading.RLock()
+_FLUSH_EVERY_N = 5  # writes per user between disk flushes
+_atexit_registered = False  # one exit flush for the process, not per manager
+
 
 class ChatContextManager:
     def __init__(self, storage_dir: str = "./chat_contexts"):
         self.storage_dir = storage_dir
         self._ensure_storage_dir()
+        # Managers are constructed per handler call but share the
+        # module-level cache, so one atexit hook covers them all;
+        # registering per instance would pin every instance for the
+        # process lifetime
+        global _atexit_registered
+        if not _atexit_registered:
+            atexit.register(self.flush_all)
+            _atexit_registered = True
 
     def _ensure_storage_dir(self):
         """Ensure storage directory exists"""
@@ -16,17 +106,43 @@ class ChatContextManager:
 
     def _get_user_file(self, user_id: str) -> str:
         """Get file path for user's chat context"""
-        return os.path.join(self.storage_dir, f"{user_id}_context.json")
+        return os.path.join(self.storage_dir, f"{user_id}{_CONTEXT_SUFFIX}")
+
+    def _migrate_legacy_json(self, user_id: str, file_path: str):
+        """One-time rewrite of a user's legacy .json context as .mpk"""
+        legacy_path = os.path.join(self.storage_dir, f"{user_id}{_JSON_SUFFIX}")
+        if not os.path.exists(legacy_path):
+            return
+        try:
+            _write_context(file_path, _load_context(legacy_path))
+            os.unlink(legacy_path)
+        except (ValueError, OSError):
+            pass
 
     def get_user_context(self, user_id: str) -> Dict:
-        """Get user's chat context and preferences"""
+        """Get user's chat context and preferences (cached for a short TTL)"""
+        with _cache_lock:
+            cached = _context_cache.get(user_id)
+            # A dirty entry is the only copy of unflushed writes, so it
+            # stays authoritative past its TTL
+            if cached and (user_id in _dirty or cached[1] > time.monotonic()):
+                return cached[0]
+
         file_path = self._get_user_file(user_id)
+        if msgpack is not None and not os.path.exists(file_path):
+            self._migrate_legacy_json(user_id, file_path)
 
         if os.path.exists(file_path):
             try:
-                with open(file_path, "r") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError):
+                context = _load_context(file_path)
+                with _cache_lock:
+                    _context_cache[user_id] = (
+                        context,
+                        time.monotonic() + _CONTEXT_TTL,
+                    )
+                return context
+            except (ValueError, FileNotFoundError):
+                # ValueError covers both stdlib and orjson decode errors
                 pass
 
         # Return default context
@@ -61,10 +177,48 @@ class ChatContextManager:
 
         current_context["last_updated"] = datetime.now().isoformat()
 
-        # Save to file
-        file_path = self._get_user_file(user_id)
-        with open(file_path, "w") as f:
-            json.dump(current_context, f, indent=2)
+        self._mark_dirty(user_id, current_context)
+
+    def _mark_dirty(self, user_id: str, context: Dict):
+        """Record an in-memory mutation and flush every few writes"""
+        with _cache_lock:
+            _context_cache[user_id] = (context, time.monotonic() + _CONTEXT_TTL)
+            _dirty.add(user_id)
+            _dirty_counts[user_id] = _dirty_counts.get(user_id, 0) + 1
+            if _dirty_counts[user_id] >= _FLUSH_EVERY_N:
+                self.flush(user_id)
+
+    def flush(self, user_id: str):
+        """Write a user's cached context to disk if it has pending changes"""
+        with _cache_lock:
+            if user_id not in _dirty:
+                return
+            cached = _context_cache.get(user_id)
+            if cached is not None:
+                _write_context(self._get_user_file(user_id), cached[0])
+            _dirty.discard(user_id)
+            _dirty_counts.pop(user_id, None)
+
+    def flush_all(self):
+        """Flush every user with pending changes (registered via atexit)"""
+        with _cache_lock:
+            for user_id in list(_dirty):
+                self.flush(user_id)
+
+    @contextmanager
+    def transaction(self, user_id: str):
+        """Load a user's context once, yield it for mutation, write once.
+
+        Lets handlers that touch several fields in one request do a single
+        read and a single dirty-marking instead of one per update_* call.
+        The mutation is discarded from the write-back queue if the block
+        raises.
+        """
+        context = self.get_user_context(user_id)
+        yield context
+
+        context["last_updated"] = datetime.now().isoformat()
+        self._mark_dirty(user_id, context)
 
     def add_chat_message(
         self, user_id: str, message: str, response: str, is_user: bool = True
@@ -85,44 +239,45 @@ class ChatContextManager:
 
         summary_parts = []
 
-        # Personal info
-        if context.get("personal_info"):
-            personal = context["personal_info"]
-            if personal.get("height") or personal.get("weight") or personal.get("age"):
-                summary_parts.append("Personal Information:")
-                if personal.get("height"):
-                    summary_parts.append(f"- Height: {personal['height']}")
-                if personal.get("weight"):
-                    summary_parts.append(f"- Weight: {personal['weight']}")
-                if personal.get("age"):
-                    summary_parts.append(f"- Age: {personal['age']}")
-                if personal.get("injuries"):
-                    summary_parts.append(f"- Injuries/Health: {personal['injuries']}")
-                if personal.get("training_plan"):
-                    summary_parts.append(
-                        f"- Current Training Plan: {personal['training_plan']}"
-                    )
+        # Personal info - pull each field once instead of the test-then-
+        # access double lookup per key; this runs every LLM turn
+        personal = context.get("personal_info") or {}
+        height = personal.get("height")
+        weight = personal.get("weight")
+        age = personal.get("age")
+        injuries = personal.get("injuries")
+        training_plan = personal.get("training_plan")
+        if height or weight or age:
+            summary_parts.append("Personal Information:")
+            if height:
+                summary_parts.append(f"- Height: {height}")
+            if weight:
+                summary_parts.append(f"- Weight: {weight}")
+            if age:
+                summary_parts.append(f"- Age: {age}")
+            if injuries:
+                summary_parts.append(f"- Injuries/Health: {injuries}")
+            if training_plan:
+                summary_parts.append(f"- Current Training Plan: {training_plan}")
 
         # Preferences
-        if context.get("preferences"):
-            prefs = context["preferences"]
-            if prefs:
-                summary_parts.append("Preferences:")
-                for key, value in prefs.items():
-                    summary_parts.append(f"- {key}: {value}")
+        prefs = context.get("preferences") or {}
+        if prefs:
+            summary_parts.append("Preferences:")
+            for key, value in prefs.items():
+                summary_parts.append(f"- {key}: {value}")
 
         # Recent chat context (last 5 messages)
-        if context.get("chat_history"):
-            recent = context["chat_history"][-5:]
-            if recent:
-                summary_parts.append("Recent Conversation Context:")
-                for entry in recent:
-                    if entry.get("is_user"):
-                        summary_parts.append(f"- You asked: {entry['message']}")
-                    else:
-                        summary_parts.append(
-                            f"- Coach responded: {entry['response'][:100]}..."
-                        )
+        recent = (context.get("chat_history") or [])[-5:]
+        if recent:
+            summary_parts.append("Recent Conversation Context:")
+            for entry in recent:
+                if entry.get("is_user"):
+                    summary_parts.append(f"- You asked: {entry['message']}")
+                else:
+                    summary_parts.append(
+                        f"- Coach responded: {entry['response'][:100]}..."
+                    )
 
         return (
             "\n".join(summary_parts)
@@ -133,8 +288,15 @@ class ChatContextManager:
     def ask_for_personal_info(self, user_id: str) -> List[str]:
         """Get list of questions to ask user for personal context"""
         context = self.get_user_context(user_id)
-        personal = context.get("personal_info", {})
+        return self.missing_questions(context.get("personal_info", {}))
+
+    @staticmethod
+    def missing_questions(personal: Dict) -> List[str]:
+        """Questions for the personal-info fields not yet present in personal.
 
+        Split out so transaction() users can compute the remainder from
+        their in-memory dict without another context read.
+        """
         questions = []
 
         if not personal.get("height"):
@@ -167,11 +329,30 @@ class ChatContextManager:
         """Clear user's chat history"""
         self.update_user_context(user_id, {"chat_history": []})
 
+    def load_all_contexts(self) -> Dict[str, Dict]:
+        """Load every user's context, reading the files in parallel.
+
+        Admin/batch paths that loop get_user_context serialize one blocking
+        read per user; a thread pool keeps many reads in flight at once
+        and populates the in-memory cache as a side effect.
+        """
+        users = self.get_all_users()
+        if not users:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(32, len(users))) as executor:
+            return dict(zip(users, executor.map(self.get_user_context, users)))
+
     def get_all_users(self) -> List[str]:
         """Get list of all user IDs"""
-        users = []
-        for filename in os.listdir(self.storage_dir):
-            if filename.endswith("_context.json"):
-                user_id = filename.replace("_context.json", "")
-                users.append(user_id)
-        return users
+        # scandir hands back DirEntry objects whose type check reuses the
+        # readdir data instead of stat-ing each entry again
+        # Both suffixes are scanned so users whose legacy .json hasn't
+        # been migrated yet still show up
+        with os.scandir(self.storage_dir) as entries:
+            users = {
+                entry.name[: entry.name.rfind("_context")]
+                for entry in entries
+                if entry.name.endswith((_MPK_SUFFIX, _JSON_SUFFIX)) and entry.is_file()
+            }
+        return list(users)
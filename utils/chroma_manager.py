@@ -1,9 +1,20 @@
 from langchain_chroma import Chroma
 from langchain.schema import Document
 from typing import List, Dict, Any
+import heapq
 import os
 import json
-from datetime import datetime
+import re
+
+# Patterns for context_to_dataframe, compiled once at import; pandas
+# .str accessors accept compiled patterns directly
+_DATE_LINE_RE = re.compile(r"^\d{4}-\d{2}-\d{2}")
+_NUM_RE = re.compile(r"([\d.]+)")
+_KM_NUM_RE = re.compile(r"KM (\d+)")
+_PACE_RE = re.compile(r"Pace ([\d.]+)")
+_HR_RE = re.compile(r"HR ([\d.]+)")
+_POWER_RE = re.compile(r"Power ([\d.]+)")
+_ELEV_RE = re.compile(r"Elevation Gain ([\d.]+)")
 
 
 class ChromaManager:
@@ -25,83 +36,105 @@ class ChromaManager:
                 embedding_function=self.embeddings, persist_directory=self.db_dir
             )
 
-    def add_documents(self, docs: List[Document]):
-        """Add documents to ChromaDB"""
+    def add_documents(self, docs: List[Document], embeddings: List = None):
+        """Add documents to ChromaDB.
+
+        When embeddings are supplied they are passed straight to the
+        underlying collection, so Chroma doesn't serialize embedding
+        generation inside its add transaction.
+        """
         if not docs:
             return
 
-        # Add documents - newer ChromaDB versions automatically persist
-        self.vectorstore.add_documents(docs)
+        if embeddings is not None:
+            import uuid
+
+            self.vectorstore._collection.add(
+                ids=[uuid.uuid4().hex for _ in docs],
+                embeddings=embeddings,
+                documents=[doc.page_content for doc in docs],
+                metadatas=[doc.metadata for doc in docs],
+            )
+        else:
+            # Add documents - newer ChromaDB versions automatically persist
+            self.vectorstore.add_documents(docs)
 
         print(f"✅ Added {len(docs)} documents to ChromaDB")
 
-    def get_existing_run_names(self) -> List[str]:
-        """Get list of existing run names to avoid duplicates"""
+    def count(self) -> int:
+        """Number of stored documents - O(1) metadata read, no decode"""
         if not self.vectorstore:
-            return []
+            return 0
+        return self.vectorstore._collection.count()
 
-        # Get all documents and extract run names
-        all_docs = self.vectorstore.get()
-        if not all_docs or not all_docs["documents"]:
-            return []
+    def get_existing_run_names(self) -> frozenset:
+        """Get existing run names to avoid duplicates.
+
+        Returned as a frozenset so callers filtering new runs get O(1)
+        membership tests instead of scanning a list per run.
+        """
+        if not self.vectorstore:
+            return frozenset()
 
-        run_names = []
-        for metadata in all_docs["metadatas"]:
-            if metadata and "name" in metadata:
-                run_names.append(metadata["name"])
+        # Only metadata is read here, so don't make Chroma materialize the
+        # document bodies (or embeddings) at all
+        all_docs = self.vectorstore.get(include=["metadatas"])
+        if not all_docs or not all_docs["metadatas"]:
+            return frozenset()
 
-        return run_names
+        return frozenset(
+            metadata["name"]
+            for metadata in all_docs["metadatas"]
+            if metadata and "name" in metadata
+        )
 
     def retrieve_runs(self, query: Dict[str, Any], top_k: int = 20) -> List[Document]:
         """Retrieve runs based on structured query"""
         if not self.vectorstore:
             return []
 
-        # 1. Decide primary filter for Chroma
-        primary_filter = None
-        if query.get("type") and query["type"] is not None:
-            primary_filter = {"type": query["type"]}
-
-        # 2. Get initial docs
-        if primary_filter:
-            retriever = self.vectorstore.as_retriever(
-                search_kwargs={"filter": primary_filter, "k": top_k * 3}
-            )
-        else:
-            retriever = self.vectorstore.as_retriever(search_kwargs={"k": top_k * 3})
-
-        # 3. Get initial docs
-        docs = retriever.invoke("")
-
-        # 4. Post-filter based on all interpreter fields
+        # 1. Push the exact-match and numeric-range filters down into a
+        # single Chroma where clause so they're evaluated at the storage
+        # layer instead of in a Python loop over over-fetched docs. Dates
+        # are stored as strings, which Chroma's range operators don't
+        # support, so they stay Python-side along with the run-name
+        # substring matching.
+        clauses = []
+        if query.get("type"):
+            clauses.append({"type": query["type"]})
+        if query.get("min_avg_hr"):
+            clauses.append({"avg_hr": {"$gte": query["min_avg_hr"]}})
+        if query.get("max_avg_hr"):
+            clauses.append({"avg_hr": {"$lte": query["max_avg_hr"]}})
+        if query.get("distance_km"):
+            clauses.append({"distance": {"$gte": query["distance_km"]}})
+
+        where = None
+        if len(clauses) == 1:
+            where = clauses[0]
+        elif clauses:
+            where = {"$and": clauses}
+
+        # Over-fetch only when Python-side filters may drop rows
+        needs_post_filter = bool(
+            query.get("start_date") or query.get("end_date") or query.get("run_names")
+        )
+        k = top_k * 3 if needs_post_filter else top_k
+
+        # 2. Get initial docs. The query here is structured metadata, not
+        # text, so a plain collection.get skips the embedding forward pass
+        # and similarity search that retriever.invoke("") would run for an
+        # ordering the empty string can't make meaningful anyway.
+        raw = self.vectorstore._collection.get(
+            where=where, limit=k, include=["metadatas", "documents"]
+        )
+        docs = self._docs_from_get(raw) if raw and raw["documents"] else []
+
+        # 3. Apply the remaining Python-side filters
         filtered_docs = []
         for doc in docs:
             meta = doc.metadata
 
-            if (
-                query.get("type")
-                and query["type"] is not None
-                and meta.get("type") != query["type"]
-            ):
-                continue
-            if (
-                query.get("min_avg_hr")
-                and query["min_avg_hr"] is not None
-                and meta.get("avg_hr", 0) < query["min_avg_hr"]
-            ):
-                continue
-            if (
-                query.get("max_avg_hr")
-                and query["max_avg_hr"] is not None
-                and meta.get("avg_hr", 9999) > query["max_avg_hr"]
-            ):
-                continue
-            if (
-                query.get("distance_km")
-                and query["distance_km"] is not None
-                and meta.get("distance") < query["distance_km"]
-            ):
-                continue
             if (
                 query.get("start_date")
                 and query["start_date"] is not None
@@ -125,75 +158,88 @@ class ChromaManager:
 
             filtered_docs.append(doc)
 
-        # 5. If last_n_runs is set, take the most recent
+        # 4. If last_n_runs is set, take the most recent; nlargest is
+        # O(N log n) vs a full sort's O(N log N)
         if query.get("last_n_runs") and query["last_n_runs"] is not None:
-            filtered_docs.sort(key=lambda x: x.metadata.get("date", ""), reverse=True)
-            filtered_docs = filtered_docs[: query["last_n_runs"]]
+            filtered_docs = heapq.nlargest(
+                query["last_n_runs"], filtered_docs, key=self._date_key
+            )
 
         return filtered_docs[:top_k]
 
+    @staticmethod
+    def _docs_from_get(all_docs) -> List[Document]:
+        """Convert a raw collection.get() result to Document objects"""
+        return [
+            Document(
+                page_content=content,
+                metadata=all_docs["metadatas"][i] if all_docs["metadatas"] else {},
+            )
+            for i, content in enumerate(all_docs["documents"])
+        ]
+
+    @staticmethod
+    def _date_key(doc: Document) -> str:
+        """Sort key for run date metadata.
+
+        Dates are stored as "%Y-%m-%d %H:%M:%S", which sorts
+        lexicographically in chronological order, so no strptime parse
+        (and no datetime allocation) per comparison is needed.
+        """
+        return doc.metadata.get("date", "") or ""
+
     def get_runs_by_names(self, run_names: List[str]) -> List[Document]:
         """Get runs by specific names for better performance"""
+        matching_docs, _ = self.get_runs_or_latest(run_names, fallback_n=0)
+        return matching_docs
+
+    def get_runs_or_latest(
+        self, run_names: List[str], fallback_n: int = 5
+    ) -> (List[Document], bool):
+        """Get runs by name, falling back to the latest N in one Chroma read.
+
+        Returns (docs, matched); matched is False when the name lookup
+        missed and the latest runs were returned instead. Doing both on
+        the same collection dump avoids a second query on the miss path.
+        """
         if not self.vectorstore:
-            return []
+            return [], False
 
-        # Get all documents
-        all_docs = self.vectorstore.get()
+        # Get all documents without their embeddings
+        all_docs = self.vectorstore.get(include=["metadatas", "documents"])
         if not all_docs or not all_docs["documents"]:
-            return []
+            return [], False
 
-        # Convert to Document objects
-        docs = []
-        for i, content in enumerate(all_docs["documents"]):
-            doc = Document(
-                page_content=content,
-                metadata=all_docs["metadatas"][i] if all_docs["metadatas"] else {},
-            )
-            docs.append(doc)
+        docs = self._docs_from_get(all_docs)
 
         # Filter by run names (case-insensitive partial matching)
+        lowered = [name.lower() for name in run_names]
         matching_docs = []
         for doc in docs:
-            run_name = doc.metadata.get("name", "")
-            if any(name.lower() in run_name.lower() for name in run_names):
+            run_name = doc.metadata.get("name", "").lower()
+            if any(name in run_name for name in lowered):
                 matching_docs.append(doc)
 
-        return matching_docs
+        if matching_docs or not fallback_n:
+            return matching_docs, True
+
+        # Nothing matched - reuse the same dump for the latest-N fallback
+        return heapq.nlargest(fallback_n, docs, key=self._date_key), False
 
     def get_latest_runs(self, n: int = 5) -> List[Document]:
         """Get the latest N runs when no documents match query"""
         if not self.vectorstore:
             return []
 
-        # Get all documents
-        all_docs = self.vectorstore.get()
+        # Get all documents without their embeddings
+        all_docs = self.vectorstore.get(include=["metadatas", "documents"])
         if not all_docs or not all_docs["documents"]:
             return []
 
-        # Convert to Document objects
-        docs = []
-        for i, content in enumerate(all_docs["documents"]):
-            doc = Document(
-                page_content=content,
-                metadata=all_docs["metadatas"][i] if all_docs["metadatas"] else {},
-            )
-            docs.append(doc)
-
-        # Sort by date and return latest N
-        # Handle date sorting more robustly
-        def get_date_key(doc):
-            date_str = doc.metadata.get("date", "")
-            try:
-                # Try to parse the date string
-                from datetime import datetime
+        docs = self._docs_from_get(all_docs)
 
-                return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S")
-            except (ValueError, TypeError):
-                # If parsing fails, use the string as is (will sort alphabetically)
-                return date_str
-
-        docs.sort(key=get_date_key, reverse=True)
-        return docs[:n]
+        # Top-N by date without sorting the whole collection
+        return heapq.nlargest(n, docs, key=self._date_key)
 
     def docs_to_context(
         self, docs: List[Document], include_per_km: bool = False
@@ -224,88 +270,185 @@ class ChromaManager:
 
         return "\n".join(context_lines)
 
-    def context_to_dataframe(self, context: str) -> "pd.DataFrame":
-        """Convert context string to pandas DataFrame for plotting"""
+    @staticmethod
+    def _float_after(tokens: List[str]) -> float:
+        """First token that parses as a float, or 0.0"""
+        for token in tokens:
+            try:
+                return float(token)
+            except ValueError:
+                continue
+        return 0.0
+
+    def docs_to_dataframe(
+        self, docs: List[Document], include_per_km: bool = True
+    ) -> "pd.DataFrame":
+        """Build the plotting DataFrame straight from Document objects.
+
+        Skips the docs_to_context/context_to_dataframe round trip - the
+        summary fields are read from doc.metadata and the per-KM lines
+        are parsed with plain string splits, so no text is formatted just
+        to be regex-parsed back.
+        """
         import pandas as pd
-        import re
 
         rows = []
-        current_run = {}
-
-        for line in context.splitlines():
-            line = line.strip()
-            if not line:
-                continue
-
-            # Header line: date | run_name | Distance | Pace | Avg HR | Elevation | Type
-            if re.match(r"^\d{4}-\d{2}-\d{2}", line):
-                parts = line.split("|")
-                if len(parts) >= 7:
-                    current_run = {
-                        "date": parts[0].strip(),
-                        "run_name": parts[1].strip(),
-                        "distance": float(re.findall(r"[\d.]+", parts[2])[0])
-                        if re.findall(r"[\d.]+", parts[2])
-                        else 0,
-                        "avg_pace": float(re.findall(r"[\d.]+", parts[3])[0])
-                        if re.findall(r"[\d.]+", parts[3])
-                        else 0,
-                        "avg_hr": float(re.findall(r"[\d.]+", parts[4])[0])
-                        if re.findall(r"[\d.]+", parts[4])
-                        else 0,
-                        "total_elevation": float(re.findall(r"[\d.]+", parts[5])[0])
-                        if re.findall(r"[\d.]+", parts[5])
-                        else 0,
-                        "run_type": parts[6].strip().replace("Type: ", ""),
-                    }
+        for doc in docs:
+            meta = doc.metadata
+            base = {
+                "date": meta.get("date", ""),
+                "run_name": meta.get("name", ""),
+                "run_type": meta.get("type", ""),
+                "distance": meta.get("distance") or 0,
+                "avg_hr": meta.get("avg_hr") or 0,
+                "avg_pace": meta.get("pace") or 0,
+                "total_elevation": meta.get("elevation_gain") or 0,
+            }
+
+            if not include_per_km:
+                rows.append(
+                    {**base, "km": 0, "pace": 0, "hr": 0, "power": 0, "elevation_gain": 0}
+                )
                 continue
 
-            # Per-KM breakdown: KM 1: Pace 8.409 min/km, HR 142.024 bpm, Power 175.074 W, Elevation Gain 8.4 m
-            if line.startswith("KM"):
+            # Per-KM breakdown lines look like
+            # KM 1: Pace 8.725 min/km, HR 146.2 bpm, Power 170 W, Elevation Gain 2.2 m
+            # The header length varies (the summarizer drops null fields),
+            # so select them by prefix rather than assuming a fixed offset
+            for line in doc.page_content.split("\n"):
+                line = line.strip()
+                if not line.startswith("KM"):
+                    continue
+                head, _, rest = line.partition(":")
                 try:
-                    km_num = int(re.findall(r"KM (\d+)", line)[0])
-                    pace = (
-                        float(re.findall(r"Pace ([\d.]+)", line)[0])
-                        if re.findall(r"Pace ([\d.]+)", line)
-                        else 0
-                    )
-                    hr = (
-                        float(re.findall(r"HR ([\d.]+)", line)[0])
-                        if re.findall(r"HR ([\d.]+)", line)
-                        else 0
-                    )
-                    power = (
-                        float(re.findall(r"Power ([\d.]+)", line)[0])
-                        if re.findall(r"Power ([\d.]+)", line)
-                        else 0
-                    )
-                    elevation_gain = (
-                        float(re.findall(r"Elevation Gain ([\d.]+)", line)[0])
-                        if re.findall(r"Elevation Gain ([\d.]+)", line)
-                        else 0
-                    )
-
-                    rows.append(
-                        {
-                            "date": current_run.get("date", ""),
-                            "run_name": current_run.get("run_name", ""),
-                            "run_type": current_run.get("run_type", ""),
-                            "km": km_num,
-                            "pace": pace,
-                            "hr": hr,
-                            "power": power,
-                            "elevation_gain": elevation_gain,
-                            "distance": current_run.get("distance", 0),
-                            "avg_hr": current_run.get("avg_hr", 0),
-                            "avg_pace": current_run.get("avg_pace", 0),
-                            "total_elevation": current_run.get("total_elevation", 0),
-                        }
-                    )
+                    km_num = int(head.split()[1])
                 except (IndexError, ValueError):
                     continue
 
+                values = {"pace": 0.0, "hr": 0.0, "power": 0.0, "elevation_gain": 0.0}
+                for segment in rest.split(","):
+                    tokens = segment.split()
+                    if not tokens:
+                        continue
+                    label = tokens[0].lower()
+                    if label == "pace":
+                        values["pace"] = self._float_after(tokens)
+                    elif label == "hr":
+                        values["hr"] = self._float_after(tokens)
+                    elif label == "power":
+                        values["power"] = self._float_after(tokens)
+                    elif label == "elevation":
+                        values["elevation_gain"] = self._float_after(tokens)
+
+                rows.append({**base, "km": km_num, **values})
+
         df = pd.DataFrame(rows)
         if not df.empty:
             df["date"] = pd.to_datetime(df["date"])
 
         return df
+
+    def context_to_dataframe(self, context: str) -> "pd.DataFrame":
+        """Convert context string to pandas DataFrame for plotting.
+
+        The whole context is parsed with vectorized pandas string ops -
+        one compiled-regex pass per field over the full line array -
+        instead of running several re.findall calls per KM line in a
+        Python loop.
+        """
+        import pandas as pd
+
+        lines = pd.Series(context.splitlines(), dtype="object").str.strip()
+        lines = lines[lines != ""]
+        if lines.empty:
+            return pd.DataFrame()
+
+        # Header line: date | run_name | Distance | Pace | Avg HR | Elevation | Type
+        is_header = lines.str.match(_DATE_LINE_RE)
+        # Per-KM breakdown: KM 1: Pace 8.409 min/km, HR 142.024 bpm, ...
+        is_km = lines.str.startswith("KM")
+        if not is_km.any():
+            return pd.DataFrame()
+
+        def _first_num(series: "pd.Series") -> "pd.Series":
+            return series.str.extract(_NUM_RE, expand=False).astype(float)
+
+        # Parse header fields with one split and one extract per column,
+        # dropping malformed headers (fewer than 7 pipe-separated parts)
+        headers = lines[is_header].str.split("|", expand=True)
+        if not headers.empty and headers.shape[1] >= 7:
+            headers = headers[headers[6].notna()]
+            header_df = pd.DataFrame(
+                {
+                    "date": headers[0].str.strip(),
+                    "run_name": headers[1].str.strip(),
+                    "distance": _first_num(headers[2]).fillna(0),
+                    "avg_pace": _first_num(headers[3]).fillna(0),
+                    "avg_hr": _first_num(headers[4]).fillna(0),
+                    "total_elevation": _first_num(headers[5]).fillna(0),
+                    "run_type": headers[6].str.strip().str.replace(
+                        "Type: ", "", regex=False
+                    ),
+                }
+            )
+        else:
+            header_df = pd.DataFrame(
+                columns=[
+                    "date",
+                    "run_name",
+                    "distance",
+                    "avg_pace",
+                    "avg_hr",
+                    "total_elevation",
+                    "run_type",
+                ]
+            )
+
+        # KM fields, each extracted independently so a missing field
+        # defaults to 0 instead of discarding the row (a row without a KM
+        # number is dropped, as before)
+        km_lines = lines[is_km]
+        km_df = pd.DataFrame(
+            {
+                "km": km_lines.str.extract(_KM_NUM_RE, expand=False),
+                "pace": km_lines.str.extract(_PACE_RE, expand=False),
+                "hr": km_lines.str.extract(_HR_RE, expand=False),
+                "power": km_lines.str.extract(_POWER_RE, expand=False),
+                "elevation_gain": km_lines.str.extract(_ELEV_RE, expand=False),
+            }
+        )
+        km_df = km_df[km_df["km"].notna()]
+        km_df["km"] = km_df["km"].astype(int)
+        for col in ("pace", "hr", "power", "elevation_gain"):
+            km_df[col] = km_df[col].astype(float).fillna(0)
+
+        # Forward-fill each header's fields onto the KM rows that follow it
+        aligned = header_df.reindex(lines.index).ffill().loc[km_df.index]
+        km_df["date"] = aligned["date"].fillna("")
+        km_df["run_name"] = aligned["run_name"].fillna("")
+        km_df["run_type"] = aligned["run_type"].fillna("")
+        km_df["distance"] = aligned["distance"].fillna(0)
+        km_df["avg_hr"] = aligned["avg_hr"].fillna(0)
+        km_df["avg_pace"] = aligned["avg_pace"].fillna(0)
+        km_df["total_elevation"] = aligned["total_elevation"].fillna(0)
+
+        df = km_df[
+            [
+                "date",
+                "run_name",
+                "run_type",
+                "km",
+                "pace",
+                "hr",
+                "power",
+                "elevation_gain",
+                "distance",
+                "avg_hr",
+                "avg_pace",
+                "total_elevation",
+            ]
+        ].reset_index(drop=True)
+        if not df.empty:
+            df["date"] = pd.to_datetime(df["date"])
+
+        return df
@@ -1,28 +1,283 @@
+import matplotlib
+
+# Agg renders headless and keeps pyplot usable off the main thread; the
+# actual figure builds run in pool workers, never on a request thread
+matplotlib.use("Agg")
+
 import matplotlib.pyplot as plt
+import numpy as np
 import pandas as pd
+from matplotlib.collections import LineCollection
+from matplotlib.lines import Line2D
+import ast
+import hashlib
 import io
 import contextlib
 import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from typing import Optional
 from datetime import datetime
 
+# Chat clients downscale images anyway, so dpi=300 just spends CPU on
+# zlib-compressing pixels nobody sees. 120 dpi is sharp on every phone
+# screen at ~1/6 the encode and upload cost; empty metadata skips the
+# default PNG text chunks matplotlib re-encodes per save.
+_SAVEFIG_KWARGS = {"dpi": 120, "bbox_inches": "tight", "metadata": {}}
+
+# Calls the AI code must not make: GUI popups and interpreter exits
+_BANNED_CALLS = {"plt.show", "show", "sys.exit", "exit", "quit"}
+
+
+class _PlotCodeCleaner(ast.NodeTransformer):
+    """Drop banned statement-level calls and module-level returns from
+    AI-generated plot code"""
+
+    def __init__(self):
+        self._func_depth = 0
+
+    def visit_FunctionDef(self, node):
+        self._func_depth += 1
+        self.generic_visit(node)
+        self._func_depth -= 1
+        return node
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_Return(self, node):
+        # A return outside any function would be a SyntaxError at compile
+        # time even though ast.parse tolerates it
+        if self._func_depth == 0:
+            return ast.Pass()
+        return node
+
+    def visit_Expr(self, node):
+        value = node.value
+        if isinstance(value, ast.Call):
+            func = value.func
+            if isinstance(func, ast.Name):
+                name = func.id
+            elif isinstance(func, ast.Attribute) and isinstance(func.value, ast.Name):
+                name = f"{func.value.id}.{func.attr}"
+            else:
+                name = None
+            if name in _BANNED_CALLS:
+                return ast.Pass()
+        return self.generic_visit(node)
+
+
+@lru_cache(maxsize=64)
+def _sanitize_ai_code(ai_code: str) -> Optional[str]:
+    """Clean AI plotting code via the AST instead of string patching.
+
+    The old str.replace approach corrupted identifiers containing
+    "return" and mangled strings mentioning plt.show; here only real
+    plt.show()/exit() statements are removed. A bare module-level return
+    (which ast.parse rejects) is neutralized line-wise before parsing.
+    The result is returned as source so it can cross the pickle boundary
+    to the render workers, which compile and cache it.
+    """
+    try:
+        tree = ast.parse(ai_code)
+    except SyntaxError:
+        # LLMs occasionally emit a top-level return; swap those lines for
+        # pass and try once more
+        fixed = "\n".join(
+            "pass" if line.startswith("return") else line
+            for line in ai_code.splitlines()
+        )
+        try:
+            tree = ast.parse(fixed)
+        except SyntaxError as e:
+            print(f"❌ AI code failed to parse: {e}")
+            return None
+
+    tree = ast.fix_missing_locations(_PlotCodeCleaner().visit(tree))
+    return ast.unparse(tree)
+
+
+@lru_cache(maxsize=64)
+def _compile_plot_code(source: str):
+    """Bytecode-compile sanitized plot code once per distinct source"""
+    return compile(source, "<ai_plot>", "exec")
+
+
+def _plot_cache_key(df: pd.DataFrame, user_question: str, variant: str) -> str:
+    """Digest of the plotted data plus the question asked.
+
+    hash_pandas_object gives a cheap deterministic per-row hash without
+    serializing the frame; the variant tag keeps AI and fallback plots
+    from colliding.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    digest.update(variant.encode())
+    digest.update(user_question.encode())
+    return digest.hexdigest()
+
+
+# Reusable figure for the fallback plot, one per render worker. The 2x2
+# layout never changes, so clearing the axes beats re-allocating the
+# hundreds of Figure/Axes/Text objects plt.subplots builds each call.
+# Workers run one task at a time, so no locking is needed.
+_simple_fig = None
+_simple_axes = None
+
+
+def _get_simple_figure():
+    global _simple_fig, _simple_axes
+    if _simple_fig is None:
+        _simple_fig, _simple_axes = plt.subplots(2, 2, figsize=(15, 10))
+    else:
+        for ax in _simple_axes.flat:
+            ax.clear()
+    return _simple_fig, _simple_axes
+
+
+def _save_current_figure(output_dir: str, prefix: str) -> str:
+    """Save the active pyplot figure under a timestamped name"""
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filepath = os.path.join(output_dir, f"{prefix}_{timestamp}.png")
+    plt.savefig(filepath, **_SAVEFIG_KWARGS)
+    plt.close("all")  # Close to free memory
+    return filepath
+
+
+def _render_ai_plot(df: pd.DataFrame, ai_code: str, output_dir: str) -> Optional[str]:
+    """Run AI-generated plotting code and save the figure.
+
+    Executed in a pool worker so the exec and the dpi=300 PNG encode
+    don't hold this process's GIL against the bot's event loop.
+    """
+    try:
+        local_env = {"plt": plt, "pd": pd, "df": df}
+
+        # Capture stdout to avoid printing during execution
+        with contextlib.redirect_stdout(io.StringIO()):
+            exec(_compile_plot_code(ai_code), {}, local_env)
+
+        # Get the current figure
+        if plt.get_fignums():
+            filepath = _save_current_figure(output_dir, "plot")
+            print(f"✅ Plot saved to {filepath}")
+            return filepath
+
+        print("⚠️ No plot generated")
+        return None
+
+    except SystemExit:
+        print("⚠️ AI code tried to exit - prevented crash")
+        return None
+    except Exception as e:
+        print(f"❌ Error executing plotting code: {e}")
+        return None
+
+
+def _render_simple_plot(
+    df: pd.DataFrame, user_question: str, output_dir: str
+) -> Optional[str]:
+    """Build the fallback multi-panel plot; executed in a pool worker"""
+    try:
+        # Reuse the worker's multi-panel figure
+        fig, axes = _get_simple_figure()
+        fig.suptitle(f"Run Analysis: {user_question}", fontsize=16)
+
+        # One sort + one groupby feeds all three per-KM panels, and each
+        # panel gets a single LineCollection artist instead of one plot()
+        # call (filter + sort + artist) per run
+        df_sorted = df.sort_values(["run_name", "km"])
+        groups = list(df_sorted.groupby("run_name"))
+        cycle_colors = plt.rcParams["axes.prop_cycle"].by_key()["color"]
+        run_colors = [cycle_colors[i % len(cycle_colors)] for i in range(len(groups))]
+        legend_handles = [
+            Line2D([0], [0], color=run_colors[i], label=run_name)
+            for i, (run_name, _) in enumerate(groups)
+        ]
+
+        def _km_panel(ax, column: str, ylabel: str, title: str):
+            segments = [
+                np.column_stack([group["km"].to_numpy(), group[column].to_numpy()])
+                for _, group in groups
+            ]
+            ax.add_collection(LineCollection(segments, colors=run_colors))
+            ax.autoscale()
+            ax.set_xlabel("Kilometer")
+            ax.set_ylabel(ylabel)
+            ax.set_title(title)
+            ax.legend(handles=legend_handles)
+            ax.grid(True)
+
+        _km_panel(axes[0, 0], "pace", "Pace (min/km)", "Pace vs. Kilometer")
+        _km_panel(axes[0, 1], "hr", "Heart Rate (bpm)", "Heart Rate vs. Kilometer")
+        _km_panel(
+            axes[1, 0],
+            "elevation_gain",
+            "Elevation Gain (m)",
+            "Elevation Gain vs. Kilometer",
+        )
+
+        # Plot 4: Summary stats
+        summary_data = (
+            df.groupby("run_name")
+            .agg({"avg_pace": "mean", "avg_hr": "mean", "total_elevation": "mean"})
+            .reset_index()
+        )
+
+        axes[1, 1].bar(summary_data["run_name"], summary_data["avg_pace"])
+        axes[1, 1].set_xlabel("Run")
+        axes[1, 1].set_ylabel("Average Pace (min/km)")
+        axes[1, 1].set_title("Average Pace by Run")
+        axes[1, 1].tick_params(axis="x", rotation=45)
+        axes[1, 1].grid(True)
+
+        fig.tight_layout()
+
+        # Save without closing - the figure is reused on the next call
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        filepath = os.path.join(output_dir, f"simple_plot_{timestamp}.png")
+        fig.savefig(filepath, **_SAVEFIG_KWARGS)
+
+        print(f"✅ Simple plot saved to {filepath}")
+        return filepath
+
+    except Exception as e:
+        print(f"❌ Error creating simple plot: {e}")
+        return None
+
 
 class PlottingAgent:
+    # One shared render pool per process - two workers cover concurrent
+    # users without forking a fresh interpreter per plot
+    _pool: Optional[ProcessPoolExecutor] = None
+
     def __init__(self, output_dir: str = None):
         if output_dir is None:
             # Default to new_bot/plots directory
-            import os
-
             output_dir = os.path.join(
                 os.path.dirname(os.path.dirname(__file__)), "plots"
             )
         self.output_dir = output_dir
+        # Rendered plots are memoized here by (data, question) digest so
+        # repeat questions skip the LLM codegen and the render entirely
+        self.cache_dir = os.path.join(output_dir, "cache")
         self._ensure_output_dir()
 
     def _ensure_output_dir(self):
         """Ensure output directory exists"""
-        if not os.path.exists(self.output_dir):
-            os.makedirs(self.output_dir)
+        if not os.path.exists(self.cache_dir):
+            os.makedirs(self.cache_dir)
+
+    def _cached_plot_path(self, df: pd.DataFrame, user_question: str, variant: str):
+        """(cache_path, hit) for this data/question combination"""
+        key = _plot_cache_key(df, user_question, variant)
+        cache_path = os.path.join(self.cache_dir, f"{key}.png")
+        return cache_path, os.path.exists(cache_path)
+
+    @classmethod
+    def _get_pool(cls) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            cls._pool = ProcessPoolExecutor(max_workers=2)
+        return cls._pool
 
     def generate_plot(
         self, df: pd.DataFrame, user_question: str, llm_response: str, llm_client
@@ -31,6 +286,11 @@ class PlottingAgent:
         if df.empty:
             return None
 
+        cache_path, hit = self._cached_plot_path(df, user_question, "ai")
+        if hit:
+            print(f"✅ Reusing cached plot {cache_path}")
+            return cache_path
+
         # Extract actual run names from the DataFrame
         actual_run_names = df["run_name"].unique().tolist()
         run_names_str = ", ".join([f'"{name}"' for name in actual_run_names])
@@ -48,15 +308,16 @@ Columns:
 - power: power W generated per split (float)
 - elevation_gain: elevation gain in meters for split (int)
 - distance: total run distance km (float) (12,0, 8.1 etc.)
-- avg_hr: average HR for entire run (float) 
-- avg_pace: average pace for entire run (float) 
-- total_elevation: total elevation for entire run (float) 
+- avg_hr: average HR for entire run (float)
+- avg_pace: average pace for entire run (float)
+- total_elevation: total elevation for entire run (float)
 
 Available run names in the data: [{run_names_str}]
 IMPORTANT: Use these exact run names when filtering data. Do not modify or guess run names.
 """
 
-        # Get plotting code from LLM
+        # Get plotting code from LLM (stays in this process - the client
+        # isn't picklable and holds the API session)
         ai_code = llm_client.get_plotting_code(
             df_description, user_question, llm_response
         )
@@ -66,123 +327,36 @@ IMPORTANT: Use these exact run names when filtering data. Do not modify or guess
 
         print("=== AI Generated Code ===\n", ai_code)
 
-        # Fix common issues in AI-generated code
-        ai_code = ai_code.replace("plt.show()", "")  # Remove plt.show() calls
-        ai_code = ai_code.replace("plt.show", "")  # Remove plt.show references
-        ai_code = ai_code.replace("exit()", "pass")  # Replace exit() with pass
-        ai_code = ai_code.replace("sys.exit()", "pass")  # Replace sys.exit() with pass
-        ai_code = ai_code.replace(
-            "return", "# return"
-        )  # Comment out return statements outside functions
-
-        # Execute the code safely
-        try:
-            local_env = {"plt": plt, "pd": pd, "df": df}
-
-            # Capture stdout to avoid printing during execution
-            with contextlib.redirect_stdout(io.StringIO()) as f:
-                exec(ai_code, {}, local_env)
-
-            # Get the current figure
-            if plt.get_fignums():
-                # Generate unique filename
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                filename = f"plot_{timestamp}.png"
-                filepath = os.path.join(self.output_dir, filename)
-
-                # Save the plot
-                plt.savefig(filepath, dpi=300, bbox_inches="tight")
-                plt.close()  # Close to free memory
-
-                print(f"✅ Plot saved to {filepath}")
-                return filepath
-            else:
-                print("⚠️ No plot generated")
-                return None
-
-        except SystemExit:
-            print("⚠️ AI code tried to exit - prevented crash")
+        # Strip plt.show()/exit() statements and stray top-level returns
+        ai_code = _sanitize_ai_code(ai_code)
+        if not ai_code:
             return None
-        except Exception as e:
-            print(f"❌ Error executing plotting code: {e}")
+
+        # Render in the shared worker pool
+        filepath = self._get_pool().submit(
+            _render_ai_plot, df, ai_code, self.output_dir
+        ).result()
+        if not filepath:
             return None
 
+        os.replace(filepath, cache_path)
+        return cache_path
+
     def create_simple_plot(self, df: pd.DataFrame, user_question: str) -> Optional[str]:
         """Create a simple fallback plot if AI plotting fails"""
         if df.empty:
             return None
 
-        try:
-            # Create a simple multi-panel plot
-            fig, axes = plt.subplots(2, 2, figsize=(15, 10))
-            fig.suptitle(f"Run Analysis: {user_question}", fontsize=16)
-
-            # Plot 1: Pace vs KM
-            for run_name in df["run_name"].unique():
-                run_data = df[df["run_name"] == run_name].sort_values(by="km")
-                axes[0, 0].plot(
-                    run_data["km"], run_data["pace"], label=run_name, marker="o"
-                )
-            axes[0, 0].set_xlabel("Kilometer")
-            axes[0, 0].set_ylabel("Pace (min/km)")
-            axes[0, 0].set_title("Pace vs. Kilometer")
-            axes[0, 0].legend()
-            axes[0, 0].grid(True)
-
-            # Plot 2: Heart Rate vs KM
-            for run_name in df["run_name"].unique():
-                run_data = df[df["run_name"] == run_name].sort_values(by="km")
-                axes[0, 1].plot(
-                    run_data["km"], run_data["hr"], label=run_name, marker="s"
-                )
-            axes[0, 1].set_xlabel("Kilometer")
-            axes[0, 1].set_ylabel("Heart Rate (bpm)")
-            axes[0, 1].set_title("Heart Rate vs. Kilometer")
-            axes[0, 1].legend()
-            axes[0, 1].grid(True)
-
-            # Plot 3: Elevation vs KM
-            for run_name in df["run_name"].unique():
-                run_data = df[df["run_name"] == run_name].sort_values(by="km")
-                axes[1, 0].plot(
-                    run_data["km"],
-                    run_data["elevation_gain"],
-                    label=run_name,
-                    marker="^",
-                )
-            axes[1, 0].set_xlabel("Kilometer")
-            axes[1, 0].set_ylabel("Elevation Gain (m)")
-            axes[1, 0].set_title("Elevation Gain vs. Kilometer")
-            axes[1, 0].legend()
-            axes[1, 0].grid(True)
-
-            # Plot 4: Summary stats
-            summary_data = (
-                df.groupby("run_name")
-                .agg({"avg_pace": "mean", "avg_hr": "mean", "total_elevation": "mean"})
-                .reset_index()
-            )
-
-            axes[1, 1].bar(summary_data["run_name"], summary_data["avg_pace"])
-            axes[1, 1].set_xlabel("Run")
-            axes[1, 1].set_ylabel("Average Pace (min/km)")
-            axes[1, 1].set_title("Average Pace by Run")
-            axes[1, 1].tick_params(axis="x", rotation=45)
-            axes[1, 1].grid(True)
-
-            plt.tight_layout()
-
-            # Save the plot
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"simple_plot_{timestamp}.png"
-            filepath = os.path.join(self.output_dir, filename)
+        cache_path, hit = self._cached_plot_path(df, user_question, "simple")
+        if hit:
+            print(f"✅ Reusing cached plot {cache_path}")
+            return cache_path
 
-            plt.savefig(filepath, dpi=300, bbox_inches="tight")
-            plt.close()
-
-            print(f"✅ Simple plot saved to {filepath}")
-            return filepath
-
-        except Exception as e:
-            print(f"❌ Error creating simple plot: {e}")
+        filepath = self._get_pool().submit(
+            _render_simple_plot, df, user_question, self.output_dir
+        ).result()
+        if not filepath:
             return None
+
+        os.replace(filepath, cache_path)
+        return cache_path
@@ -1,37 +1,111 @@
 import os
 import json
 import re
+import tempfile
 from typing import Optional, Dict, Any
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# USERS blob extractor for migrating legacy .env files, compiled once
+_USERS_RE = re.compile(r"USERS=({.*})", re.DOTALL)
+
+
+def _dumps_users(users: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(users)
+    return json.dumps(users, separators=(",", ":")).encode()
+
+
+def _loads_users(raw: bytes) -> Dict[str, Any]:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
 
 class TokenManager:
-    """Manages Strava refresh tokens for multiple users"""
+    """Manages Strava refresh tokens for multiple users.
+
+    Users live in a users.json file next to .env; the legacy USERS= blob
+    embedded in .env is migrated over on first load, which removes the
+    regex read-modify-rewrite of the whole .env file per token refresh.
+    """
 
     def __init__(self, env_file_path: str = ".env"):
         self.env_file_path = env_file_path
+        self.users_file = os.path.join(os.path.dirname(env_file_path), "users.json")
+        # Parsed users dict, cached until the file mtime changes so token
+        # lookups don't re-read and re-parse per Strava API call
+        self._users_cache: Optional[Dict[str, Any]] = None
+        self._users_mtime: float = 0.0
+
+    def _migrate_env_users(self) -> Dict[str, Any]:
+        """One-shot migration of the legacy USERS= blob out of .env"""
+        if not os.path.exists(self.env_file_path):
+            return {}
+
+        with open(self.env_file_path, "r") as file:
+            content = file.read()
+
+        users_match = _USERS_RE.search(content)
+        if not users_match:
+            return {}
 
-    def update_refresh_token(self, user_id: str, new_refresh_token: str) -> bool:
-        """Update refresh token for a specific user in the .env file"""
         try:
-            if not os.path.exists(self.env_file_path):
-                print(f"⚠️ .env file not found at {self.env_file_path}")
-                return False
+            users = json.loads(users_match.group(1))
+        except json.JSONDecodeError as e:
+            print(f"❌ Error parsing USERS JSON: {e}")
+            return {}
 
-            # Read the current .env file
-            with open(self.env_file_path, "r") as file:
-                content = file.read()
+        self._write_users(users)
+        print(f"✅ Migrated USERS from {self.env_file_path} to {self.users_file}")
+        return users
 
-            # Parse the USERS JSON string
-            users_match = re.search(r"USERS=({.*})", content, re.DOTALL)
-            if not users_match:
-                print("⚠️ USERS configuration not found in .env file")
-                return False
+    def _write_users(self, users: Dict[str, Any]):
+        """Atomically replace users.json (tmp file + rename)"""
+        users_dir = os.path.dirname(self.users_file) or "."
+        fd, tmp_path = tempfile.mkstemp(dir=users_dir, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(_dumps_users(users))
+            os.replace(tmp_path, self.users_file)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+        self._users_cache = users
+        self._users_mtime = os.stat(self.users_file).st_mtime
+
+    def _load_users(self) -> Dict[str, Any]:
+        """Parsed users dict, re-read only when users.json changes"""
+        try:
+            mtime = os.stat(self.users_file).st_mtime
+        except OSError:
+            return self._migrate_env_users()
 
-            try:
-                users_json = users_match.group(1)
-                users = json.loads(users_json)
-            except json.JSONDecodeError as e:
-                print(f"❌ Error parsing USERS JSON: {e}")
+        if self._users_cache is not None and mtime == self._users_mtime:
+            return self._users_cache
+
+        try:
+            with open(self.users_file, "rb") as file:
+                users = _loads_users(file.read())
+        except (OSError, ValueError) as e:
+            print(f"❌ Error reading {self.users_file}: {e}")
+            return {}
+
+        self._users_cache = users
+        self._users_mtime = mtime
+        return users
+
+    def update_refresh_token(self, user_id: str, new_refresh_token: str) -> bool:
+        """Update refresh token for a specific user"""
+        try:
+            users = self._load_users()
+            if not users:
+                print("⚠️ USERS configuration not found")
                 return False
 
             # Update the refresh token for the specific user
@@ -42,17 +116,9 @@ class TokenManager:
                 print(f"⚠️ User {user_id} not found in USERS configuration")
                 return False
 
-            # Reconstruct the .env content with updated USERS
-            new_users_json = json.dumps(users, separators=(",", ":"))
-            new_content = re.sub(
-                r"USERS=({.*})", f"USERS={new_users_json}", content, flags=re.DOTALL
-            )
-
-            # Write the updated .env file
-            with open(self.env_file_path, "w") as file:
-                file.write(new_content)
+            self._write_users(users)
 
-            print(f"✅ Refresh token for user {user_id} saved to .env file")
+            print(f"✅ Refresh token for user {user_id} saved to {self.users_file}")
             return True
 
         except Exception as e:
@@ -60,28 +126,11 @@ class TokenManager:
             return False
 
     def get_refresh_token(self, user_id: str) -> Optional[str]:
-        """Get refresh token for a specific user from the .env file"""
+        """Get refresh token for a specific user"""
         try:
-            if not os.path.exists(self.env_file_path):
-                return None
-
-            with open(self.env_file_path, "r") as file:
-                content = file.read()
-
-            # Parse the USERS JSON string
-            users_match = re.search(r"USERS=({.*})", content, re.DOTALL)
-            if not users_match:
-                return None
-
-            try:
-                users_json = users_match.group(1)
-                users = json.loads(users_json)
-            except json.JSONDecodeError:
-                return None
-
+            users = self._load_users()
             if user_id in users:
                 return users[user_id].get("strava_refresh_token")
-
             return None
 
         except Exception as e:
@@ -89,25 +138,10 @@ class TokenManager:
             return None
 
     def list_users(self) -> Dict[str, Any]:
-        """Get all users and their configurations from the .env file"""
+        """Get all users and their configurations"""
         try:
-            if not os.path.exists(self.env_file_path):
-                return {}
-
-            with open(self.env_file_path, "r") as file:
-                content = file.read()
-
-            # Parse the USERS JSON string
-            users_match = re.search(r"USERS=({.*})", content, re.DOTALL)
-            if not users_match:
-                return {}
-
-            try:
-                users_json = users_match.group(1)
-                return json.loads(users_json)
-            except json.JSONDecodeError:
-                return {}
+            return self._load_users()
 
         except Exception as e:
-            print(f"❌ Error reading users from .env: {e}")
+            print(f"❌ Error reading users: {e}")
             return {}
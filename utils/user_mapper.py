@@ -1,50 +1,87 @@
-from config import USERS
-from typing import Optional, Dict, Any
+from config import USERS, STRAVA_CLIENT_ID, STRAVA_CLIENT_SECRET
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple
 
 
 class UserMapper:
     """Maps Telegram chat IDs to usernames and manages user configuration"""
 
-    @staticmethod
-    def get_username_by_chat_id(chat_id: str) -> Optional[str]:
-        """Get username by Telegram chat ID"""
+    # chat_id -> (username, config), built once so every lookup is a
+    # dict hit instead of a scan over USERS - the per-field getters used
+    # to cascade into one scan each per call
+    _by_chat_id: Dict[int, Tuple[str, Dict[str, Any]]] = {}
+
+    @classmethod
+    def rebuild_index(cls):
+        """Rebuild the chat-id index after USERS mutates (hot reload)"""
+        cls._by_chat_id = {
+            user_config["chat_id"]: (username, user_config)
+            for username, user_config in USERS.items()
+            if user_config.get("chat_id") is not None
+        }
+        cls.get_user_config.cache_clear()
+
+    @classmethod
+    def _lookup(cls, chat_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """(username, config) for a chat ID, or None"""
         try:
-            chat_id_int = int(chat_id)
-            for username, user_config in USERS.items():
-                if user_config.get("chat_id") == chat_id_int:
-                    return username
-            return None
+            return cls._by_chat_id.get(int(chat_id))
         except (ValueError, TypeError):
             return None
 
-    @staticmethod
-    def get_user_config_by_chat_id(chat_id: str) -> Optional[Dict[str, Any]]:
+    @classmethod
+    def get_username_by_chat_id(cls, chat_id: str) -> Optional[str]:
+        """Get username by Telegram chat ID"""
+        entry = cls._lookup(chat_id)
+        return entry[0] if entry else None
+
+    @classmethod
+    def get_user_config_by_chat_id(cls, chat_id: str) -> Optional[Dict[str, Any]]:
         """Get user configuration by Telegram chat ID"""
-        username = UserMapper.get_username_by_chat_id(chat_id)
-        if username:
-            return USERS.get(username)
-        return None
+        entry = cls._lookup(chat_id)
+        return entry[1] if entry else None
 
     @staticmethod
-    def get_strava_token_by_chat_id(chat_id: str) -> Optional[str]:
+    @lru_cache(maxsize=128)
+    def get_user_config(chat_id: str) -> Optional[Dict[str, Any]]:
+        """Resolve all user fields for a chat ID in one cached lookup.
+
+        Returns everything at once, with the global Strava credentials
+        already applied as fallbacks.
+        """
+        entry = UserMapper._lookup(chat_id)
+        if not entry:
+            return None
+
+        username, user_config = entry
+        return {
+            "username": username,
+            "refresh_token": user_config.get("strava_refresh_token"),
+            "client_id": user_config.get("strava_client_id") or STRAVA_CLIENT_ID,
+            "client_secret": user_config.get("strava_client_secret")
+            or STRAVA_CLIENT_SECRET,
+        }
+
+    @classmethod
+    def get_strava_token_by_chat_id(cls, chat_id: str) -> Optional[str]:
         """Get Strava refresh token by Telegram chat ID"""
-        user_config = UserMapper.get_user_config_by_chat_id(chat_id)
+        user_config = cls.get_user_config_by_chat_id(chat_id)
         if user_config:
             return user_config.get("strava_refresh_token")
         return None
 
-    @staticmethod
-    def get_strava_client_id_by_chat_id(chat_id: str) -> Optional[str]:
+    @classmethod
+    def get_strava_client_id_by_chat_id(cls, chat_id: str) -> Optional[str]:
         """Get Strava client ID by Telegram chat ID"""
-        user_config = UserMapper.get_user_config_by_chat_id(chat_id)
+        user_config = cls.get_user_config_by_chat_id(chat_id)
         if user_config:
             return user_config.get("strava_client_id")
         return None
 
-    @staticmethod
-    def get_strava_client_secret_by_chat_id(chat_id: str) -> Optional[str]:
+    @classmethod
+    def get_strava_client_secret_by_chat_id(cls, chat_id: str) -> Optional[str]:
         """Get Strava client secret by Telegram chat ID"""
-        user_config = UserMapper.get_user_config_by_chat_id(chat_id)
+        user_config = cls.get_user_config_by_chat_id(chat_id)
         if user_config:
             return user_config.get("strava_client_secret")
         return None
@@ -54,10 +91,10 @@ class UserMapper:
         """Get all users and their configurations"""
         return USERS.copy()
 
-    @staticmethod
-    def is_user_configured(chat_id: str) -> bool:
+    @classmethod
+    def is_user_configured(cls, chat_id: str) -> bool:
         """Check if a user is properly configured"""
-        user_config = UserMapper.get_user_config_by_chat_id(chat_id)
+        user_config = cls.get_user_config_by_chat_id(chat_id)
         if not user_config:
             return False
 
@@ -66,3 +103,6 @@ class UserMapper:
             user_config.get("chat_id") is not None
             and user_config.get("strava_refresh_token") is not None
         )
+
+
+UserMapper.rebuild_index()